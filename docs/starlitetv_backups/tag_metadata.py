@@ -16,54 +16,198 @@ File naming convention:
   short-Title_Name_YYYY.ext
 """
 
+import errno
+import http.client
 import json
 import os
 import re
 import shutil
+import sqlite3
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import urllib.parse
-import urllib.request
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    # orjson parses ffprobe/API JSON several times faster when installed
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 RAPIDAPI_KEY = "e29a1f30b2msh3b4e6e9e61f285dp16e656jsne6f6a81c6cb7"
 RAPIDAPI_HOST = "imdb236.p.rapidapi.com"
 VIDEO_EXTENSIONS = {".mp4", ".mkv", ".avi", ".m4v", ".mov", ".webm", ".flv", ".ts"}
+VIDEO_EXT_TUPLE = tuple(sorted(VIDEO_EXTENSIONS))  # for str.endswith
+API_MIN_INTERVAL = 0.3  # seconds between RapidAPI requests, shared by all workers
+CACHE_PATH = os.path.expanduser("~/.cache/tag_metadata.db")
+CACHE_TTL = 30 * 24 * 3600  # re-query IMDB after 30 days
+YEAR_MIN, YEAR_MAX = 1920, 2030  # 4-digit numbers outside this aren't years
+
+# Filename patterns used by parse_title_year, compiled once at import
+_RE_PREFIX = re.compile(r'^(film|show|short|tv)[_-]')
+_RE_GROUP_PREFIX = re.compile(r'^\[.*?\]\s*(.+)')
+_RE_GROUP_EPISODE_TAIL = re.compile(r'\s*-\s*\d+\s*(END\s*)?\(.*$', re.IGNORECASE)
+_RE_GROUP_EPISODE = re.compile(r'\s*-\s*\d+\s*$')
+_RE_DOT_EPISODE = re.compile(r'\.S\d+E\d+.*$', re.IGNORECASE)
+_RE_DOT_QUALITY = re.compile(
+    r'\.(1080p|720p|480p|2160p|BluRay|BDRip|WEB-DL|AMZN|HDTV|DVDRip).*$', re.IGNORECASE)
+_RE_DOT_YEAR = re.compile(r'\.(\d{4})$')
+_RE_EPISODE = re.compile(r'-?s\d+e\d+.*$', re.IGNORECASE)
+_RE_MULTI_EPISODE = re.compile(r'-\d+$')
+_RE_YEAR = re.compile(r'[_\-\s](\d{4})$')
+_RE_PAREN_YEAR = re.compile(r'\((\d{4})\)')
+_RE_PAREN_YEAR_STRIP = re.compile(r'\s*\(\d{4}\)')
+# Trailing junk on the cleaned title: "Part N", [group tags], (quality info).
+# Stripped repeatedly until none match.
+_RE_TITLE_TAIL = re.compile(
+    r'\s*(?:Part\s*\d+\s*'
+    r'|\[.*?\]\s*'
+    r'|\(.*?(?:DVD|BD|BDRip|1080p|720p|x264|x265|HEVC|FLAC|Opus|Dual).*?\)\s*)$',
+    re.IGNORECASE)
+# Codec/source markers and everything after. Kept out of _RE_TITLE_TAIL: it
+# can start inside a bracket or paren, so it must only run once those are gone.
+_RE_QUALITY_TAIL = re.compile(r'\s*(DVD|BD|BDRip|Dual.Audio|x264|x265|HEVC)\b.*$', re.IGNORECASE)
+
+_api_lock = threading.Lock()
+_api_last_call = 0.0
+# In-place taggers; files they can't handle are remuxed with ffmpeg instead
+MKVPROPEDIT = shutil.which("mkvpropedit")
+MKVEXTRACT = shutil.which("mkvextract")
+ATOMICPARSLEY = shutil.which("AtomicParsley")
+TAGGED_XATTR = "user.fs42.tagged"  # "<mtime_ns>:<size>:<codec>" of a verified file
+_cache_local = threading.local()
+_cache_unavailable = False  # set once the cache can't be opened; run without it
+_http_local = threading.local()
+
+# Per-thread output buffer. scan_directory's workers log into it so each
+# file's lines come out as one block instead of interleaving with others.
+_output = threading.local()
+
+
+def _say(msg=""):
+    """print() a progress line, or buffer it while a worker owns the thread."""
+    lines = getattr(_output, "lines", None)
+    if lines is None:
+        print(msg)
+    else:
+        lines.append(msg)
+
+
+def _rate_limit():
+    """Block until at least API_MIN_INTERVAL has passed since the last API call.
+
+    Worker threads share one slot, so the API sees the same request rate
+    no matter how many files are processed in parallel.
+    """
+    global _api_last_call
+    with _api_lock:
+        wait = _api_last_call + API_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _api_last_call = time.monotonic()
+
+
+def _cache_db():
+    """Return this thread's connection to the IMDB response cache.
 
+    Returns None if the cache can't be opened (say, an unwritable cache
+    directory); the scan then carries on uncached.
+    """
+    global _cache_unavailable
+    conn = getattr(_cache_local, "conn", None)
+    if conn is None and not _cache_unavailable:
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            conn = sqlite3.connect(CACHE_PATH, timeout=30)
+            conn.execute("CREATE TABLE IF NOT EXISTS imdb "
+                         "(query TEXT PRIMARY KEY, ts INTEGER, json BLOB)")
+            conn.execute("CREATE TABLE IF NOT EXISTS tagged "
+                         "(path TEXT PRIMARY KEY, stamp TEXT)")
+        except (OSError, sqlite3.Error) as e:
+            _cache_unavailable = True
+            _say(f"  Cache unavailable, continuing without it: {e}")
+            return None
+        _cache_local.conn = conn
+    return conn
+
+
+def _cache_get(query):
+    """Return cached autocomplete results for query, or None on a miss."""
+    conn = _cache_db()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT json FROM imdb WHERE query = ? AND ts > ?",
+            (query, int(time.time()) - CACHE_TTL),
+        ).fetchone()
+    except sqlite3.Error as e:
+        _say(f"  Cache error: {e}")
+        return None
+    return json_loads(row[0]) if row else None
 
-def get_existing_metadata(filepath):
-    """Read existing metadata from a video file."""
+
+def _cache_put(query, results):
+    conn = _cache_db()
+    if conn is None:
+        return
+    try:
+        conn.execute("INSERT OR REPLACE INTO imdb VALUES (?, ?, ?)",
+                     (query, int(time.time()), json.dumps(results)))
+        conn.commit()
+    except sqlite3.Error as e:
+        _say(f"  Cache error: {e}")
+
+
+def probe_file(filepath):
+    """Read existing metadata and the video codec with a single ffprobe call.
+
+    Returns (meta, codec). meta is {} and codec is "unknown" on failure.
+    """
     try:
         result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", filepath],
-            capture_output=True, text=True, timeout=30,
+            ["ffprobe", "-v", "quiet", "-print_format", "json",
+             "-show_format", "-show_streams", "-select_streams", "v:0",
+             filepath],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30,
         )
-        data = json.loads(result.stdout)
-        tags = data.get("format", {}).get("tags", {})
-        return {
-            "title": tags.get("title", ""),
-            "date": tags.get("date", ""),
-            "artist": tags.get("artist", ""),
-            "comment": tags.get("comment", ""),
-        }
+        data = json_loads(result.stdout)
     except Exception as e:
-        print(f"  ERROR reading metadata: {e}")
-        return {}
+        _say(f"  ERROR reading metadata: {e}")
+        return {}, "unknown"
+
+    tags = data.get("format", {}).get("tags", {})
+    meta = {
+        "title": tags.get("title", ""),
+        "date": tags.get("date", ""),
+        "artist": tags.get("artist", ""),
+        "comment": tags.get("comment", ""),
+    }
+    streams = data.get("streams") or [{}]
+    codec = streams[0].get("codec_name", "")
+    return meta, codec
 
 
 def is_metadata_complete(meta):
     """Check if all required metadata fields are properly set."""
-    if not meta.get("title"):
-        return False
-    if not meta.get("date"):
-        return False
-    if not meta.get("artist") or not meta["artist"].startswith("http"):
-        return False
-    if not meta.get("comment") or len(meta["comment"]) < 10:
-        return False
-    return True
+    artist = meta.get("artist")
+    comment = meta.get("comment")
+    return bool(meta.get("title") and meta.get("date")
+                and artist and artist.startswith("http")
+                and comment and len(comment) >= 10)
 
 
+def _valid_year(digits):
+    """True if a 4-digit string from a filename is a plausible release year."""
+    return YEAR_MIN <= int(digits) <= YEAR_MAX
+
+
+@lru_cache(maxsize=8192)
 def parse_title_year(filename):
     """Extract a clean title and year from a filename.
 
@@ -78,58 +222,53 @@ def parse_title_year(filename):
     name = os.path.splitext(filename)[0]
 
     # Strip prefix (film-, show-, short-, tv-, film_)
-    name = re.sub(r'^(film|show|short|tv)[_-]', '', name)
+    name = _RE_PREFIX.sub('', name)
 
     # Handle [Group] prefix: "[Moozzi2] Serial Experiments Lain - 01 (...)"
-    bracket_match = re.match(r'^\[.*?\]\s*(.+)', name)
+    bracket_match = _RE_GROUP_PREFIX.match(name)
     if bracket_match:
         name = bracket_match.group(1)
         # Strip episode number and everything after: " - 01 (..." or " - 13 END (...)"
-        name = re.sub(r'\s*-\s*\d+\s*(END\s*)?\(.*$', '', name, flags=re.IGNORECASE)
+        name = _RE_GROUP_EPISODE_TAIL.sub('', name)
         # Also strip just " - 01" at end
-        name = re.sub(r'\s*-\s*\d+\s*$', '', name)
+        name = _RE_GROUP_EPISODE.sub('', name)
 
     # Handle dot-separated names: "Ash.vs.Evil.Dead.S01E01.El.Jefe.1080p..."
     # or "Angel.Cop.1989.1080p.BluRay.x264-OFT"
     dot_year_val = None
     if '.' in name and '_' not in name:
         # Strip from SxxExx onward
-        name = re.sub(r'\.S\d+E\d+.*$', '', name, flags=re.IGNORECASE)
+        name = _RE_DOT_EPISODE.sub('', name)
         # Strip from resolution/quality markers onward
-        name = re.sub(r'\.(1080p|720p|480p|2160p|BluRay|BDRip|WEB-DL|AMZN|HDTV|DVDRip).*$', '', name, flags=re.IGNORECASE)
+        name = _RE_DOT_QUALITY.sub('', name)
         # Try to extract 4-digit year at end after dots
-        dot_year = re.search(r'\.(\d{4})$', name)
+        dot_year = _RE_DOT_YEAR.search(name)
         if dot_year:
-            candidate = dot_year.group(1)
-            if 1920 <= int(candidate) <= 2030:
-                dot_year_val = candidate
+            if _valid_year(dot_year.group(1)):
+                dot_year_val = dot_year.group(1)
                 name = name[:dot_year.start()]
         # Convert dots to spaces
         name = name.replace('.', ' ')
 
     # Strip season/episode suffix (underscore-separated names)
-    name = re.sub(r'-?s\d+e\d+.*$', '', name, flags=re.IGNORECASE)
+    name = _RE_EPISODE.sub('', name)
 
     # Strip multi-episode markers like "-02" at end
-    name = re.sub(r'-\d+$', '', name)
+    name = _RE_MULTI_EPISODE.sub('', name)
 
     # Try to extract year
-    year_match = re.search(r'[_\-\s](\d{4})$', name)
+    year_match = _RE_YEAR.search(name)
     year = None
-    if year_match:
-        candidate = int(year_match.group(1))
-        if 1920 <= candidate <= 2030:
-            year = year_match.group(1)
-            name = name[:year_match.start()]
+    if year_match and _valid_year(year_match.group(1)):
+        year = year_match.group(1)
+        name = name[:year_match.start()]
 
     # Also try (YYYY) format
     if not year:
-        year_match = re.search(r'\((\d{4})\)', name)
-        if year_match:
-            candidate = int(year_match.group(1))
-            if 1920 <= candidate <= 2030:
-                year = year_match.group(1)
-                name = re.sub(r'\s*\(\d{4}\)', '', name)
+        year_match = _RE_PAREN_YEAR.search(name)
+        if year_match and _valid_year(year_match.group(1)):
+            year = year_match.group(1)
+            name = _RE_PAREN_YEAR_STRIP.sub('', name)
 
     # Check if we extracted a year from the dot-name path above
     if not year and dot_year_val:
@@ -138,96 +277,272 @@ def parse_title_year(filename):
     # Convert underscores to spaces
     title = name.replace('_', ' ').strip()
 
-    # Strip "Part1", "Part2" etc for cleaner search
-    title = re.sub(r'\s*Part\s*\d+\s*$', '', title, flags=re.IGNORECASE).strip()
-
-    # Strip trailing brackets, quality info, group tags
-    title = re.sub(r'\s*\[.*?\]\s*$', '', title).strip()
-    title = re.sub(r'\s*\(.*?(DVD|BD|BDRip|1080p|720p|x264|x265|HEVC|FLAC|Opus|Dual).*?\)\s*$', '', title, flags=re.IGNORECASE).strip()
+    # Strip "Part1", trailing brackets, quality info, group tags, but never
+    # the whole title ("Part 2 [x]" keeps "Part 2")
+    while (tail := _RE_TITLE_TAIL.search(title)) and tail.start() > 0:
+        title = title[:tail.start()].rstrip()
 
     # Strip "Dual-Audio", codec info, etc from end
-    title = re.sub(r'\s*(DVD|BD|BDRip|Dual.Audio|x264|x265|HEVC)\b.*$', '', title, flags=re.IGNORECASE).strip()
+    title = _RE_QUALITY_TAIL.sub('', title).strip()
 
     return title, year
 
 
-def imdb_autocomplete(query):
-    """Search IMDB via RapidAPI autocomplete endpoint."""
-    url = f"https://{RAPIDAPI_HOST}/api/imdb/autocomplete?query={urllib.parse.quote(query)}"
-    req = urllib.request.Request(url, headers={
+def _api_get(path):
+    """GET a RapidAPI path and decode the JSON body.
+
+    Each worker thread keeps one HTTPS connection open, so repeated lookups
+    skip the TCP and TLS handshakes. A dropped keep-alive is retried once on
+    a fresh connection.
+    """
+    headers = {
         "x-rapidapi-host": RAPIDAPI_HOST,
         "x-rapidapi-key": RAPIDAPI_KEY,
         "User-Agent": "Mozilla/5.0",
         "Accept": "application/json",
-    })
+    }
+    for attempt in range(2):
+        conn = getattr(_http_local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPSConnection(RAPIDAPI_HOST, timeout=10)
+            _http_local.conn = conn
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            _http_local.conn = None
+            if attempt:
+                raise
+            continue
+        if resp.status != 200:
+            raise http.client.HTTPException(f"HTTP {resp.status} {resp.reason}")
+        return json_loads(body)
+
+
+def imdb_autocomplete(query):
+    """Search IMDB via RapidAPI autocomplete endpoint.
+
+    Responses are cached on disk for CACHE_TTL, keyed by the normalized query.
+    Empty responses aren't cached: they're as likely a passing API hiccup
+    as a title IMDB doesn't know, and caching one would hide it for the TTL.
+    """
+    key = query.lower().strip()
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    _rate_limit()
+    path = f"/api/imdb/autocomplete?query={urllib.parse.quote(query)}"
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = json.loads(resp.read())
-            return data if isinstance(data, list) else []
+        data = _api_get(path)
     except Exception as e:
-        print(f"  API error: {e}")
+        _say(f"  API error: {e}")
         return []
+    results = data if isinstance(data, list) else []
+    if results:
+        _cache_put(key, results)
+    return results
 
 
 def find_best_match(results, title, year=None):
-    """Find the best IMDB match from autocomplete results."""
+    """Find the best IMDB match from autocomplete results.
+
+    Each result is ranked by the strongest rule it satisfies, in priority
+    order: exact title + year, title contains/contained + year, year +
+    significant word overlap, close year (within 2) + title contains, and
+    finally the first result if its year matches or no year was given.
+    Ties go to the earlier result.
+    """
     if not results:
         return None
 
     title_lower = title.lower()
     # Also match without common suffixes
     title_words = set(title_lower.split())
-
-    # First pass: exact title + year match
-    if year:
-        for r in results:
+    min_overlap = min(2, len(title_words))
+    y = int(year) if year else None
+
+    best, best_rank = None, 0
+    for i, r in enumerate(results):
+        r_year_val = r.get("startYear")
+        if y is None:
+            rank = 1 if i == 0 else 0
+        else:
             r_title = r.get("primaryTitle", "").lower()
-            r_year = str(r.get("startYear", ""))
-            if r_title == title_lower and r_year == year:
+            year_match = str(r.get("startYear", "")) == year
+            contains = title_lower in r_title or r_title in title_lower
+            if year_match and r_title == title_lower:
                 return r
+            elif year_match and contains:
+                rank = 4
+            elif year_match and len(title_words & set(r_title.split())) >= min_overlap:
+                rank = 3
+            elif contains and str(r_year_val).isdigit() and abs(int(r_year_val) - y) <= 2:
+                rank = 2
+            elif i == 0 and year_match:
+                rank = 1
+            else:
+                rank = 0
+        if rank > best_rank:
+            best, best_rank = r, rank
 
-    # Second pass: title contains or is contained in result + year match
-    if year:
-        for r in results:
-            r_title = r.get("primaryTitle", "").lower()
-            r_year = str(r.get("startYear", ""))
-            if r_year == year and (title_lower in r_title or r_title in title_lower):
-                return r
+    return best
 
-    # Third pass: year match + significant word overlap
-    if year:
-        for r in results:
-            r_title = r.get("primaryTitle", "").lower()
-            r_year = str(r.get("startYear", ""))
-            r_words = set(r_title.split())
-            overlap = title_words & r_words
-            if r_year == year and len(overlap) >= min(2, len(title_words)):
-                return r
 
-    # Fourth pass: close year (within 2 years) + title match
-    if year:
-        y = int(year)
-        for r in results:
-            r_title = r.get("primaryTitle", "").lower()
-            r_year_val = r.get("startYear")
-            if r_year_val and abs(int(r_year_val) - y) <= 2:
-                if title_lower in r_title or r_title in title_lower:
-                    return r
+def _run_stderr_tail(cmd, timeout, tail=200):
+    """Run cmd with stdout discarded, keeping only the last bytes of stderr.
+
+    A remux can log a lot; this bounds memory per worker instead of
+    buffering and decoding the whole stream. Returns (returncode, tail text).
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    buf = bytearray()
+
+    def drain():
+        for chunk in iter(lambda: proc.stderr.read(4096), b""):
+            buf.extend(chunk)
+            del buf[:-tail]
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        reader.join()
+        proc.stderr.close()
+    return returncode, buf.decode(errors="replace")
+
+
+# Targets children that tie a tag to a track/edition/chapter/attachment;
+# a Tag without any of them is global
+_MKV_TARGET_UIDS = ("TrackUID", "EditionUID", "ChapterUID", "AttachmentUID")
+
+
+def _read_mkv_global_tags(filepath):
+    """Return the file's global tags as a <Tags> element, or None on error.
+
+    mkvpropedit --tags global: replaces every global tag, so the existing
+    ones are read back with mkvextract and rewritten along with ours.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        xml_path = os.path.join(tmpdir, "tags.xml")
+        returncode, err_tail = _run_stderr_tail(
+            [MKVEXTRACT, filepath, "tags", xml_path], timeout=120)
+        # mkvextract exits 1 for warnings, 2 for errors
+        if returncode > 1:
+            _say(f"  mkvextract error: {err_tail}")
+            return None
+        if not os.path.exists(xml_path) or os.path.getsize(xml_path) == 0:
+            return ET.Element("Tags")  # file has no tags
+        root = ET.parse(xml_path).getroot()
+
+    tags = ET.Element("Tags")
+    for tag in root.findall("Tag"):
+        targets = tag.find("Targets")
+        if targets is None or not any(targets.find(uid) is not None
+                                      for uid in _MKV_TARGET_UIDS):
+            tags.append(tag)
+    return tags
+
+
+def _merge_mkv_tags(tags, values):
+    """Set top-level Simple tags in a <Tags> element of global tags.
+
+    values maps tag names to strings. Existing Simple tags with those names
+    (any case) are dropped and the new ones go in the first tag with empty
+    Targets, created if needed; every other tag is kept as is.
+    """
+    names = {name.upper() for name in values}
+    for tag in tags.findall("Tag"):
+        for simple in tag.findall("Simple"):
+            if (simple.findtext("Name") or "").upper() in names:
+                tag.remove(simple)
+
+    for tag in tags.findall("Tag"):
+        targets = tag.find("Targets")
+        if targets is None or len(targets) == 0:
+            break
+    else:
+        tag = ET.SubElement(tags, "Tag")
+        ET.SubElement(tag, "Targets")
+    for name, value in values.items():
+        simple = ET.SubElement(tag, "Simple")
+        ET.SubElement(simple, "Name").text = name
+        ET.SubElement(simple, "String").text = value
+    return tags
+
+
+def _write_metadata_mkv(filepath, title, date, artist, comment):
+    """Edit Matroska tags in place with mkvpropedit (no remux).
+
+    Writes the segment title plus DATE/ARTIST/COMMENT global tags, the same
+    layout ffmpeg's matroska muxer produces. Other global tags are kept.
+    """
+    tags = _read_mkv_global_tags(filepath)
+    if tags is None:
+        return False
+    _merge_mkv_tags(tags, {"DATE": date, "ARTIST": artist, "COMMENT": comment})
+
+    with tempfile.NamedTemporaryFile("wb", suffix=".xml", delete=False) as f:
+        ET.ElementTree(tags).write(f, encoding="utf-8", xml_declaration=True)
+        tags_path = f.name
+    try:
+        returncode, err_tail = _run_stderr_tail(
+            [MKVPROPEDIT, "--quiet", filepath,
+             "--edit", "info", "--set", f"title={title}",
+             "--tags", f"global:{tags_path}"],
+            timeout=120,
+        )
+    finally:
+        os.unlink(tags_path)
+    # mkvpropedit exits 1 for warnings, 2 for errors
+    if returncode > 1:
+        _say(f"  mkvpropedit error: {err_tail}")
+        return False
+    return True
 
-    # Fallback: first result only if year matches or no year specified
-    if results:
-        if not year:
-            return results[0]
-        r_year = str(results[0].get("startYear", ""))
-        if r_year == year:
-            return results[0]
 
-    return None
+def _write_metadata_mp4(filepath, title, date, artist, comment):
+    """Edit MP4 tags in place with AtomicParsley (no remux when padding allows)."""
+    returncode, err_tail = _run_stderr_tail(
+        [ATOMICPARSLEY, filepath,
+         "--title", title, "--year", date,
+         "--artist", artist, "--comment", comment,
+         "--overWrite"],
+        timeout=120,
+    )
+    if returncode != 0:
+        _say(f"  AtomicParsley error: {err_tail}")
+        return False
+    return True
 
 
 def write_metadata(filepath, title, date, artist, comment):
-    """Write metadata to a video file using ffmpeg."""
+    """Write metadata to a video file.
+
+    MKV and MP4/M4V files are edited in place when mkvtoolnix/AtomicParsley
+    are installed, which avoids rewriting multi-GB files. Everything else
+    (and any in-place failure) goes through an ffmpeg stream-copy remux.
+    .mov is left to ffmpeg since its QuickTime metadata differs from the
+    iTunes-style atoms AtomicParsley writes.
+    """
     ext = os.path.splitext(filepath)[1].lower()
+    try:
+        if ext == ".mkv" and MKVPROPEDIT and MKVEXTRACT:
+            if _write_metadata_mkv(filepath, title, date, artist, comment):
+                return True
+        elif ext in (".mp4", ".m4v") and ATOMICPARSLEY:
+            if _write_metadata_mp4(filepath, title, date, artist, comment):
+                return True
+    except Exception as e:
+        _say(f"  In-place write error: {e}")
+
     tmp = filepath + ".tmp" + ext
 
     cmd = [
@@ -242,56 +557,46 @@ def write_metadata(filepath, title, date, artist, comment):
     ]
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode == 0:
+        returncode, err_tail = _run_stderr_tail(cmd, timeout=120)
+        if returncode == 0:
             os.replace(tmp, filepath)
             return True
         else:
-            print(f"  ffmpeg error: {result.stderr[-200:]}")
+            _say(f"  ffmpeg error: {err_tail}")
             if os.path.exists(tmp):
                 os.unlink(tmp)
             return False
     except Exception as e:
-        print(f"  Write error: {e}")
+        _say(f"  Write error: {e}")
         if os.path.exists(tmp):
             os.unlink(tmp)
         return False
 
 
-def get_codec(filepath):
-    """Get the video codec of a file."""
-    try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-select_streams", "v:0",
-             "-show_entries", "stream=codec_name", "-of", "csv=p=0", filepath],
-            capture_output=True, text=True, timeout=30,
-        )
-        return result.stdout.strip()
-    except Exception:
-        return "unknown"
-
+def process_file(filepath, dry_run=False, meta=None):
+    """Process a single video file: check metadata, query IMDB if needed, write.
 
-def process_file(filepath, dry_run=False):
-    """Process a single video file: check metadata, query IMDB if needed, write."""
+    meta is the file's existing metadata if the caller already probed it.
+    """
     filename = os.path.basename(filepath)
-    print(f"\n--- {filename} ---")
+    _say(f"\n--- {filename} ---")
 
-    meta = get_existing_metadata(filepath)
+    if meta is None:
+        meta, _ = probe_file(filepath)
     if is_metadata_complete(meta):
-        print(f"  OK: \"{meta['title']}\" ({meta['date']})")
+        _say(f"  OK: \"{meta['title']}\" ({meta['date']})")
         return "ok"
 
     # Parse title/year from filename
     title, year = parse_title_year(filename)
     if not title:
-        print(f"  SKIP: Cannot parse title from filename")
+        _say(f"  SKIP: Cannot parse title from filename")
         return "skip"
 
-    print(f"  Parsed: \"{title}\" year={year or '?'}")
+    _say(f"  Parsed: \"{title}\" year={year or '?'}")
 
     # Query IMDB
     query = f"{title} {year}" if year else title
-    time.sleep(0.3)  # rate limit
     results = imdb_autocomplete(query)
 
     if not results:
@@ -300,7 +605,7 @@ def process_file(filepath, dry_run=False):
 
     match = find_best_match(results, title, year)
     if not match:
-        print(f"  NO MATCH found on IMDB")
+        _say(f"  NO MATCH found on IMDB")
         return "no_match"
 
     # Extract metadata
@@ -320,48 +625,157 @@ def process_file(filepath, dry_run=False):
             else:
                 new_comment = new_comment[:first_dot + 1]
 
-    print(f"  IMDB: \"{new_title}\" ({new_date})")
-    print(f"  Poster: {new_artist[:60]}..." if new_artist else "  Poster: none")
-    print(f"  Desc: {new_comment[:80]}..." if len(new_comment) > 80 else f"  Desc: {new_comment}")
+    _say(f"  IMDB: \"{new_title}\" ({new_date})")
+    _say(f"  Poster: {new_artist[:60]}..." if new_artist else "  Poster: none")
+    _say(f"  Desc: {new_comment[:80]}..." if len(new_comment) > 80 else f"  Desc: {new_comment}")
 
     if dry_run:
-        print(f"  DRY RUN: would write metadata")
+        _say(f"  DRY RUN: would write metadata")
         return "would_tag"
 
     if write_metadata(filepath, new_title, new_date, new_artist, new_comment):
-        print(f"  TAGGED successfully")
+        _say(f"  TAGGED successfully")
         return "tagged"
     else:
-        print(f"  FAILED to write metadata")
+        _say(f"  FAILED to write metadata")
         return "failed"
 
 
-def scan_directory(dirpath, dry_run=False):
-    """Scan a directory recursively for video files and process them."""
-    stats = {"ok": 0, "tagged": 0, "no_match": 0, "failed": 0, "skip": 0,
-             "would_tag": 0, "needs_transcode": []}
+def _iter_video_files(dirpath):
+    """Yield video file paths under dirpath, depth-first in name order.
+
+    Uses os.scandir so file type and symlink checks come from the directory
+    listing instead of a stat() per entry.
+    """
+    try:
+        with os.scandir(dirpath) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return
+
+    subdirs = []
+    for entry in entries:
+        # Skip symlinks — process the target instead
+        if entry.is_symlink():
+            continue
+        if entry.is_dir():
+            subdirs.append(entry.path)
+            continue
+        name = entry.name
+        if not name.lower().endswith(VIDEO_EXT_TUPLE):
+            continue
+        # Skip subtitle files, staging files, etc.
+        if name.startswith('.'):
+            continue
+        yield entry.path
+
+    for subdir in subdirs:
+        yield from _iter_video_files(subdir)
+
+
+def _read_tagged_marker(filepath):
+    """Return the stamp left by _write_tagged_marker, or None.
+
+    Stored as an xattr on the file; filesystems without xattr support fall
+    back to the tagged table in the sqlite cache.
+    """
+    try:
+        return os.getxattr(filepath, TAGGED_XATTR).decode()
+    except AttributeError:
+        pass  # no xattr support on this platform
+    except OSError as e:
+        if e.errno != errno.ENOTSUP:
+            return None
+    conn = _cache_db()
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT stamp FROM tagged WHERE path = ?", (filepath,)).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _write_tagged_marker(filepath, stamp):
+    try:
+        os.setxattr(filepath, TAGGED_XATTR, stamp.encode())
+        return
+    except AttributeError:
+        pass
+    except OSError as e:
+        if e.errno != errno.ENOTSUP:
+            return
+    conn = _cache_db()
+    if conn is None:
+        return
+    try:
+        conn.execute("INSERT OR REPLACE INTO tagged VALUES (?, ?)", (filepath, stamp))
+        conn.commit()
+    except sqlite3.Error as e:
+        _say(f"  Cache error: {e}")
+
 
-    for root, dirs, files in sorted(os.walk(dirpath)):
-        for filename in sorted(files):
-            ext = os.path.splitext(filename)[1].lower()
-            if ext not in VIDEO_EXTENSIONS:
-                continue
-            # Skip subtitle files, staging files, etc.
-            if filename.startswith('.'):
-                continue
+def _process_one(filepath, dry_run):
+    """Worker for scan_directory: tag one file and report its codec.
 
-            filepath = os.path.join(root, filename)
+    Returns (result, codec, filepath, output) where output is everything
+    the file logged, for the caller to print in one piece.
+    """
+    _output.lines = []
+    try:
+        result, codec = _tag_one(filepath, dry_run)
+        return result, codec, filepath, "\n".join(_output.lines)
+    finally:
+        _output.lines = None
+
+
+def _tag_one(filepath, dry_run):
+    """Tag one file; returns (result, codec).
+
+    Files already verified as complete are skipped without running ffprobe
+    as long as their mtime and size haven't changed since.
+    """
+    try:
+        st = os.stat(filepath)
+        file_key = f"{st.st_mtime_ns}:{st.st_size}:"
+    except OSError:
+        file_key = None
+
+    if file_key:
+        marker = _read_tagged_marker(filepath)
+        if marker and marker.startswith(file_key):
+            return "ok", marker[len(file_key):]
+
+    meta, codec = probe_file(filepath)
+    result = process_file(filepath, dry_run=dry_run, meta=meta)
+    if result == "ok" and file_key and not dry_run:
+        _write_tagged_marker(filepath, file_key + codec)
+    return result, codec
+
+
+def scan_directory(dirpath, dry_run=False, jobs=None):
+    """Scan a directory recursively for video files and process them.
+
+    Files are processed in parallel: each one is dominated by ffprobe/ffmpeg
+    subprocesses and HTTP round trips, so threads overlap that waiting.
+    Each file's output is printed as one block, in file order.
+    """
+    stats = {"ok": 0, "tagged": 0, "no_match": 0, "failed": 0, "skip": 0,
+             "would_tag": 0, "needs_transcode": []}
 
-            # Skip symlinks — process the target instead
-            if os.path.islink(filepath):
-                continue
+    filepaths = list(_iter_video_files(dirpath))
 
-            result = process_file(filepath, dry_run=dry_run)
+    workers = jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for result, codec, filepath, output in ex.map(
+                _process_one, filepaths, [dry_run] * len(filepaths)):
+            if output:
+                print(output, flush=True)
             if result in stats:
                 stats[result] += 1
 
             # Check codec
-            codec = get_codec(filepath)
             if codec and codec not in ("h264", "unknown", ""):
                 stats["needs_transcode"].append((filepath, codec))
 
@@ -373,6 +787,8 @@ def main():
     parser = argparse.ArgumentParser(description="Tag video files with IMDB metadata")
     parser.add_argument("dirs", nargs="+", help="Directories to scan")
     parser.add_argument("--dry-run", action="store_true", help="Don't write, just report")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="Files to process in parallel (default: CPU count)")
     args = parser.parse_args()
 
     all_stats = {"ok": 0, "tagged": 0, "no_match": 0, "failed": 0, "skip": 0,
@@ -385,7 +801,7 @@ def main():
         print(f"\n{'='*60}")
         print(f"Scanning: {d}")
         print(f"{'='*60}")
-        stats = scan_directory(d, dry_run=args.dry_run)
+        stats = scan_directory(d, dry_run=args.dry_run, jobs=args.jobs)
         for k in all_stats:
             if k == "needs_transcode":
                 all_stats[k].extend(stats[k])
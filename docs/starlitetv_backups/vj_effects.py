@@ -5,6 +5,17 @@ Daypart profiles control the mood: energetic daytime, moody nighttime, dark over
 """
 
 import random
+from collections import namedtuple
+
+# Dedicated generator so effect picks don't share state with other modules'
+# use of the global random functions, and can be made reproducible via seed()
+_rng = random.Random()
+
+
+def seed(value=None):
+    """Seed the effects RNG (None reseeds from OS entropy)."""
+    _rng.seed(value)
+
 
 # Light effects — subtle, can stack freely
 LIGHT_EFFECTS = [
@@ -85,6 +96,39 @@ DAYPART_PROFILES = {
     },
 }
 
+# Flattened profiles for the pick_* hot path, built once at import:
+# (light_w, medium_threshold, speed_range, overlay_chance, blend_modes)
+_PROFILE_CACHE = {
+    name: (
+        prof["tier_weights"][0],
+        prof["tier_weights"][0] + prof["tier_weights"][1],
+        prof["speed_range"],
+        prof["overlay_chance"],
+        tuple(prof["blend_modes"]),
+    )
+    for name, prof in DAYPART_PROFILES.items()
+}
+_DEFAULT_PROFILE = _PROFILE_CACHE["default"]
+
+
+def _profile(daypart):
+    """Return the flattened profile tuple for daypart, or the default one."""
+    return _PROFILE_CACHE.get(daypart, _DEFAULT_PROFILE)
+
+
+def _pool(effects):
+    """Resolve an effect catalog to (name, filter) tuples."""
+    return tuple((e["name"], e["filter"]) for e in effects)
+
+
+_TIERS = ("light", "medium", "heavy")
+_TIER_POOLS = {
+    "light": _pool(LIGHT_EFFECTS),
+    "medium": _pool(MEDIUM_EFFECTS),
+    "heavy": _pool(HEAVY_EFFECTS),
+}
+_OVERLAY_POOL = _pool(OVERLAY_EFFECTS)
+
 
 # Effects that clash — never pick these together
 INCOMPATIBLE_PAIRS = [
@@ -92,62 +136,83 @@ INCOMPATIBLE_PAIRS = [
 ]
 
 
-def pick_effects(min_count=1, max_count=3, daypart=None):
-    """Pick a random set of effects respecting tier limits.
+def _build_blocks(pairs):
+    """Map each effect name to the names it may not be combined with."""
+    blocks = {}
+    for pair in pairs:
+        for name in pair:
+            blocks.setdefault(name, set()).update(pair - {name})
+    return {name: frozenset(names) for name, names in blocks.items()}
 
-    Daypart controls the probability of each tier.
-    Returns a list of effect dicts.
+
+_BLOCKS = _build_blocks(INCOMPATIBLE_PAIRS)
+
+
+def _make_effect_picker(light_w, medium_threshold):
+    """Build a pick_effects body specialized to one daypart's tier weights.
+
+    The cumulative weights and the lookups the loop needs are bound once
+    here instead of being resolved on every call.
     """
-    profile = DAYPART_PROFILES.get(daypart, DAYPART_PROFILES["default"])
-    light_w = profile["tier_weights"][0]
-    medium_threshold = light_w + profile["tier_weights"][1]
-
-    count = random.randint(min_count, max_count)
-    chosen = []
-    chosen_names = set()
-    medium_count = 0
-    heavy_count = 0
-
-    for _ in range(count):
-        roll = random.random()
-        if roll < light_w:
-            pool = LIGHT_EFFECTS
-            tier = "light"
-        elif roll < medium_threshold:
-            pool = MEDIUM_EFFECTS
-            tier = "medium"
-        else:
-            pool = HEAVY_EFFECTS
-            tier = "heavy"
-
-        # Enforce tier limits
-        if tier == "medium" and medium_count >= 2:
-            pool = LIGHT_EFFECTS
-            tier = "light"
-        elif tier == "heavy" and heavy_count >= 1:
-            pool = MEDIUM_EFFECTS if medium_count < 2 else LIGHT_EFFECTS
-            tier = "medium" if medium_count < 2 else "light"
-
-        # Filter out incompatible effects
+    # Cumulative weights match the light/medium/heavy thresholds; anything
+    # past medium is heavy.
+    cum_weights = (light_w, medium_threshold, 1.0)
+    tier_pools = _TIER_POOLS
+    blocks = _BLOCKS
+    randint = _rng.randint
+    choices = _rng.choices
+    choice = _rng.choice
+
+    def pick(min_count, max_count):
+        count = randint(min_count, max_count)
+        chosen = []
         blocked = set()
-        for pair in INCOMPATIBLE_PAIRS:
-            overlap = chosen_names & pair
-            if overlap:
-                blocked |= pair - overlap
-        eligible = [e for e in pool if e["name"] not in blocked]
-        if not eligible:
-            eligible = pool
+        medium_count = 0
+        heavy_count = 0
 
-        effect = random.choice(eligible)
-        chosen.append(effect)
-        chosen_names.add(effect["name"])
+        # Roll every slot's tier in one call
+        for tier in choices(_TIERS, cum_weights=cum_weights, k=count):
+            # Enforce tier limits
+            if tier == "medium" and medium_count >= 2:
+                tier = "light"
+            elif tier == "heavy" and heavy_count >= 1:
+                tier = "medium" if medium_count < 2 else "light"
+            pool = tier_pools[tier]
 
-        if tier == "medium":
-            medium_count += 1
-        elif tier == "heavy":
-            heavy_count += 1
+            # Filter out effects incompatible with anything already chosen
+            eligible = [e for e in pool if e[0] not in blocked] if blocked else pool
+            if not eligible:
+                eligible = pool
 
-    return chosen
+            effect = choice(eligible)
+            chosen.append(effect)
+            blocked.update(blocks.get(effect[0], ()))
+
+            if tier == "medium":
+                medium_count += 1
+            elif tier == "heavy":
+                heavy_count += 1
+
+        return chosen
+
+    return pick
+
+
+# One specialized picker per daypart, built at import
+_EFFECT_PICKERS = {
+    name: _make_effect_picker(light_w, medium_threshold)
+    for name, (light_w, medium_threshold, _, _, _) in _PROFILE_CACHE.items()
+}
+_DEFAULT_EFFECT_PICKER = _EFFECT_PICKERS["default"]
+
+
+def pick_effects(min_count=1, max_count=3, daypart=None):
+    """Pick a random set of effects respecting tier limits.
+
+    Daypart controls the probability of each tier.
+    Returns a list of (name, filter) tuples.
+    """
+    return _EFFECT_PICKERS.get(daypart, _DEFAULT_EFFECT_PICKER)(min_count, max_count)
 
 
 def pick_speed(daypart=None):
@@ -155,37 +220,77 @@ def pick_speed(daypart=None):
 
     > 1.0 = slower playback (dreamy), < 1.0 = faster playback (energetic).
     """
-    profile = DAYPART_PROFILES.get(daypart, DAYPART_PROFILES["default"])
-    low, high = profile["speed_range"]
-    return round(random.uniform(low, high), 2)
+    low, high = _profile(daypart)[2]
+    return round(_rng.uniform(low, high), 2)
 
 
 def should_overlay(daypart=None):
     """Return True if this clip should be a two-clip overlay composite."""
-    profile = DAYPART_PROFILES.get(daypart, DAYPART_PROFILES["default"])
-    return random.random() < profile["overlay_chance"]
+    overlay_chance = _profile(daypart)[3]
+    return _rng.random() < overlay_chance
 
 
 def pick_blend_mode(daypart=None):
     """Pick a blend mode for overlay compositing."""
-    profile = DAYPART_PROFILES.get(daypart, DAYPART_PROFILES["default"])
-    return random.choice(profile["blend_modes"])
+    blends = _profile(daypart)[4]
+    return _rng.choice(blends)
 
 
 def pick_overlay_effects(min_count=1, max_count=3, daypart=None):
     """Pick effects for an overlay clip — includes overlay-only effects like zoompan."""
     effects = pick_effects(min_count, max_count, daypart=daypart)
     # 30% chance to add an overlay-only effect
-    if OVERLAY_EFFECTS and random.random() < 0.30:
-        effects.append(random.choice(OVERLAY_EFFECTS))
+    if _OVERLAY_POOL and _rng.random() < 0.30:
+        effects.append(_rng.choice(_OVERLAY_POOL))
     return effects
 
 
+# Everything picked for one clip; blend_mode is None unless overlay is set
+ClipPlan = namedtuple("ClipPlan", "speed overlay blend_mode effects")
+
+
+def pick_plan(min_count=1, max_count=3, daypart=None, allow_overlay=True):
+    """Pick speed, overlay, blend mode and effects for one clip in one call.
+
+    Same distributions as pick_speed/should_overlay/pick_blend_mode and
+    pick_effects (pick_overlay_effects for overlays), with the daypart
+    profile and effect picker looked up once. allow_overlay=False skips the
+    overlay roll, e.g. when there aren't two clips to composite.
+    """
+    _, _, (low, high), overlay_chance, blends = _profile(daypart)
+    speed = round(_rng.uniform(low, high), 2)
+    overlay = allow_overlay and _rng.random() < overlay_chance
+    effects = _EFFECT_PICKERS.get(daypart, _DEFAULT_EFFECT_PICKER)(min_count, max_count)
+    blend_mode = None
+    if overlay:
+        blend_mode = _rng.choice(blends)
+        if _OVERLAY_POOL and _rng.random() < 0.30:
+            effects.append(_rng.choice(_OVERLAY_POOL))
+    return ClipPlan(speed, overlay, blend_mode, effects)
+
+
+def pick_schedule(n, daypart=None, min_count=1, max_count=3):
+    """Pick effects, speeds, overlay flags and blend modes for n clips at once.
+
+    Returns parallel lists (effects, speeds, overlays, blend_modes), drawn
+    with the same distributions as pick_effects/pick_speed/should_overlay/
+    pick_blend_mode but with the profile resolved once for the whole batch.
+    """
+    _, _, (low, high), overlay_chance, blends = _profile(daypart)
+    rand = _rng.random
+    uniform = _rng.uniform
+    speeds = [round(uniform(low, high), 2) for _ in range(n)]
+    overlays = [rand() < overlay_chance for _ in range(n)]
+    blend_modes = _rng.choices(blends, k=n)
+    effects = [pick_effects(min_count, max_count, daypart=daypart) for _ in range(n)]
+    return effects, speeds, overlays, blend_modes
+
+
 def build_filter_string(effects):
     """Build a comma-separated FFmpeg filter string from a list of effects."""
-    return ",".join(e["filter"] for e in effects)
+    return ",".join([f for _, f in effects])
 
 
 def effect_names(effects):
     """Return a list of effect names for logging."""
-    return [e["name"] for e in effects]
+    return [name for name, _ in effects]
@@ -4,10 +4,13 @@
 Architecture:
   - Music thread: decodes tracks one-by-one to raw PCM, writes to a named pipe
     (FIFO). Tracks play continuously as a playlist, independent of video clips.
-  - Main thread: renders random video clips (video-only, no audio) with VJ
-    effects to staging .ts files, queues them for the feeder thread.
+  - Main thread: picks random video clips and renders them (video-only, no
+    audio) with VJ effects on a small worker pool to staging .ts files on
+    tmpfs, queuing them for the feeder thread in order.
   - Feeder thread: reads .ts bytes from staging, writes to the streamer's stdin
-    pipe, then deletes the staging file.
+    pipe, then deletes the staging file. With mixing.direct_feed set, renders
+    write to a pipe instead and the feeder splices it straight in
+    (--debug-staging goes back to staging files).
   - Streamer FFmpeg: reads video from stdin pipe + audio from the FIFO, muxes
     them into HLS output. Video is copied (already NVENC-encoded), audio is
     encoded to AAC from raw PCM.
@@ -15,25 +18,40 @@ Architecture:
 Runs on starlite, outputs HLS to NFS share for FieldStation42 Pi playback.
 """
 
+import collections
+import ctypes
+import ctypes.util
 import datetime
-import glob as globmod
+import errno
+import fcntl
+import heapq
 import json
 import logging
 import logging.handlers
 import os
 import queue
 import random
+import select
 import shutil
 import signal
 import stat
+import struct
 import subprocess
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import vj_effects
 
+try:
+    # orjson parses config and ffprobe JSON several times faster when installed
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 log = logging.getLogger("vjdj")
 log.setLevel(logging.INFO)
 _formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s",
@@ -53,91 +71,568 @@ SCRIPT_DIR = Path(__file__).parent
 MEDIA_EXTENSIONS = {".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv", ".ts", ".m4v"}
 AUDIO_EXTENSIONS = {".mp3", ".flac", ".ogg", ".m4a", ".wav", ".aac", ".opus", ".wma"}
 
-MIN_FREE_BYTES = 1024 * 1024 * 1024  # 1 GB minimum free space
+MIN_FREE_BYTES = 1024 * 1024 * 1024  # 1 GB minimum free space (HLS output)
 MAX_STAGING_FILES = 30               # Max .ts files allowed in staging dir
+# Staged clips live for seconds between render and feed, so keep them in RAM
+# (tmpfs) when it can hold MAX_STAGING_FILES worst-case clips, else on disk.
+# Override with "staging_dir" in vj_config.json.
+TMPFS_STAGING_DIR = "/dev/shm/vjdj_staging"
+DISK_STAGING_DIR = os.path.join(SCRIPT_DIR, "staging")
 DISK_CHECK_INTERVAL = 30             # Seconds between disk-full sleeps
 
+# Media durations survive restarts here, keyed by path and checked against
+# the file's mtime/size, so unchanged files never need ffprobe again.
+PROBE_CACHE_PATH = SCRIPT_DIR / "probe_cache.json"
+_probe_cache = {}  # path -> [mtime_ns, size, duration]
+_probe_cache_lock = threading.Lock()
+_probe_cache_dirty = False
+
+# Library scans probe files in parallel; ffprobe is spawn/IO bound, so run
+# more workers than cores but never more than MAX_FFPROBES processes at once
+SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+MAX_FFPROBES = 32
+_ffprobe_slots = threading.BoundedSemaphore(MAX_FFPROBES)
+_scan_pool = None  # shared by every scan; started on first use
+_scan_pool_lock = threading.Lock()
+
 
 def load_config():
     config_path = SCRIPT_DIR / "vj_config.json"
-    with open(config_path) as f:
-        return json.load(f)
+    with open(config_path, "rb") as f:
+        return json_loads(f.read())
+
+
+def probe_cache_load():
+    """Load the persisted probe cache, starting empty if it's missing or bad."""
+    global _probe_cache
+    try:
+        with open(PROBE_CACHE_PATH, "rb") as f:
+            data = json_loads(f.read())
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable probe cache %s: %s", PROBE_CACHE_PATH, e)
+        return
+    with _probe_cache_lock:
+        _probe_cache = data
+    log.info("Loaded %d cached media durations", len(data))
+
+
+def probe_cache_save():
+    """Write the probe cache to disk if it changed since the last save."""
+    global _probe_cache_dirty
+    with _probe_cache_lock:
+        if not _probe_cache_dirty:
+            return
+        tmp = PROBE_CACHE_PATH.with_suffix(".tmp")
+        try:
+            with open(tmp, "w") as f:
+                json.dump(_probe_cache, f)
+            os.replace(tmp, PROBE_CACHE_PATH)
+            _probe_cache_dirty = False
+        except OSError as e:
+            log.warning("Could not save probe cache: %s", e)
+
+
+def probe_cache_prune(directory, present):
+    """Forget cached files below directory that aren't in present."""
+    global _probe_cache_dirty
+    prefix = os.path.join(directory, "")
+    present = set(present)
+    with _probe_cache_lock:
+        gone = [key for key in _probe_cache
+                if key.startswith(prefix) and key not in present]
+        for key in gone:
+            del _probe_cache[key]
+        if gone:
+            _probe_cache_dirty = True
 
 
 def probe_duration(filepath):
+    """Get media file duration in seconds, using the probe cache or ffprobe."""
+    global _probe_cache_dirty
+    key = str(filepath)
+    try:
+        st = os.stat(key)
+    except OSError as e:
+        log.warning("Could not probe duration of %s: %s", filepath, e)
+        return None
+    with _probe_cache_lock:
+        hit = _probe_cache.get(key)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+
+    dur = _ffprobe_duration(filepath)
+    if dur is not None:
+        with _probe_cache_lock:
+            _probe_cache[key] = [st.st_mtime_ns, st.st_size, dur]
+            _probe_cache_dirty = True
+    return dur
+
+
+def _ffprobe_duration(filepath):
     """Get media file duration in seconds using ffprobe."""
     try:
-        result = subprocess.run(
-            [
-                "ffprobe", "-v", "quiet",
-                "-print_format", "json",
-                "-show_format",
-                str(filepath),
-            ],
-            capture_output=True, text=True, timeout=30,
-        )
-        data = json.loads(result.stdout)
+        with _ffprobe_slots:
+            result = subprocess.run(
+                [
+                    "ffprobe", "-v", "quiet",
+                    # Duration comes from the container header; don't let
+                    # ffprobe analyze seconds of stream data to find it
+                    "-analyzeduration", "100000", "-probesize", "500000",
+                    "-print_format", "json",
+                    "-show_format",
+                    str(filepath),
+                ],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30,
+            )
+        data = json_loads(result.stdout)
         return float(data["format"]["duration"])
     except Exception as e:
         log.warning("Could not probe duration of %s: %s", filepath, e)
         return None
 
 
+# ---------------------------------------------------------------------------
+# Library change notification (Linux inotify)
+# ---------------------------------------------------------------------------
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = os.O_CLOEXEC
+IN_NONBLOCK = os.O_NONBLOCK
+
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+class Inotify:
+    """Minimal inotify binding over libc via ctypes.
+
+    Raises OSError if inotify isn't available on this system.
+    """
+
+    def __init__(self, flags=IN_CLOEXEC):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                               use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            init1 = libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise OSError(f"inotify unavailable: {e}") from None
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = init1(flags)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask):
+        """Watch path for mask events; returns the watch descriptor."""
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self):
+        """Block for events; returns a list of (wd, mask, name)."""
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+# scan_media_files results, valid until inotify reports a change under the
+# scanned root. Only used while a LibraryWatcher is running.
+_scan_cache = {}  # root directory -> [(path, duration), ...]
+_scan_generation = 0  # bumped on every invalidation
+_scan_cache_lock = threading.Lock()
+
+
+def _invalidate_scans(roots=None):
+    """Drop cached scans for roots (all of them when roots is None)."""
+    global _scan_generation
+    with _scan_cache_lock:
+        if roots is None:
+            _scan_cache.clear()
+        else:
+            for root in roots:
+                _scan_cache.pop(root, None)
+        _scan_generation += 1
+
+
+class LibraryWatcher:
+    """Background thread that invalidates scan results on library changes.
+
+    scan_media_files registers every directory it walks; any create, delete,
+    rename or finished write below a scanned root drops that root's cached
+    scan so the next call rescans it.
+    """
+
+    MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CLOSE_WRITE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    def __init__(self):
+        self._inotify = Inotify()
+        self._roots = {}  # wd -> set of scan roots it belongs to
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="library-watch", daemon=True).start()
+
+    def watch(self, path, root):
+        try:
+            wd = self._inotify.add_watch(path, self.MASK)
+        except OSError as e:
+            log.debug("Could not watch %s: %s", path, e)
+            return
+        with self._lock:
+            self._roots.setdefault(wd, set()).add(root)
+
+    def _run(self):
+        while True:
+            try:
+                events = self._inotify.read_events()
+            except OSError as e:
+                log.error("Library watcher stopped: %s", e)
+                _invalidate_scans()
+                return
+            changed = set()
+            overflow = False
+            with self._lock:
+                for wd, mask, _ in events:
+                    if mask & IN_Q_OVERFLOW:
+                        overflow = True
+                        continue
+                    changed |= self._roots.get(wd, set())
+                    if mask & IN_IGNORED:
+                        self._roots.pop(wd, None)
+            if overflow:
+                _invalidate_scans()
+            elif changed:
+                log.info("Library changed under %s — rescanning on next use",
+                         ", ".join(sorted(changed)))
+                _invalidate_scans(changed)
+
+
+_library_watcher = None
+
+
+def start_library_watcher():
+    """Start watching scanned directories so library edits apply without a restart."""
+    global _library_watcher
+    try:
+        _library_watcher = LibraryWatcher()
+    except OSError as e:
+        log.warning("%s — library changes need a restart to be picked up", e)
+
+
+def probe_duration_batch(paths):
+    """Probe many files concurrently; returns durations in the order of paths.
+
+    Rescans are mostly cache hits, so the worker pool is kept between them
+    rather than spawning a fresh set of threads each time.
+    """
+    global _scan_pool
+    with _scan_pool_lock:
+        if _scan_pool is None:
+            _scan_pool = ThreadPoolExecutor(max_workers=SCAN_WORKERS,
+                                            thread_name_prefix="Scan")
+    return list(_scan_pool.map(probe_duration, paths))
+
+
 def scan_media_files(directory, extensions):
-    """Scan a directory recursively for media files, return list of (path, duration)."""
+    """Scan a directory recursively for media files, return list of (path, duration).
+
+    While the library watcher runs, results are cached until a change below
+    directory is reported.
+    """
+    directory = str(directory)
+    watcher = _library_watcher
+    if watcher is not None:
+        with _scan_cache_lock:
+            cached = _scan_cache.get(directory)
+            generation = _scan_generation
+        if cached is not None:
+            return cached
+
     files = []
-    dirpath = Path(directory)
-    if not dirpath.exists():
+    if not os.path.exists(directory):
         log.warning("Directory does not exist: %s", directory)
         return files
-    for f in sorted(dirpath.rglob("*")):
-        if f.is_file() and f.suffix.lower() in extensions:
-            dur = probe_duration(f)
-            if dur and dur > 0:
-                files.append((str(f), dur))
-                log.debug("Found: %s (%.1fs)", f.name, dur)
+    # Iterative scandir walk: d_type answers is_dir/is_file without a stat
+    # per entry. Like rglob, symlinked directories are not descended.
+    candidates = []
+    complete = True
+    stack = [directory]
+    while stack:
+        dirpath = stack.pop()
+        if watcher is not None:
+            watcher.watch(dirpath, directory)
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif (entry.is_file()
+                          and os.path.splitext(entry.name)[1].lower() in extensions):
+                        candidates.append(entry.path)
+        except OSError as e:
+            log.warning("Could not scan %s: %s", e.filename, e)
+            complete = False
+    candidates.sort()
+    for path, dur in zip(candidates, probe_duration_batch(candidates)):
+        if dur and dur > 0:
+            files.append((path, dur))
+            log.debug("Found: %s (%.1fs)", os.path.basename(path), dur)
+    # A partial walk can't tell deleted files from unreadable ones
+    if complete:
+        probe_cache_prune(directory, candidates)
+    probe_cache_save()
+    if watcher is not None:
+        with _scan_cache_lock:
+            # Don't cache a scan that raced with a change notification
+            if _scan_generation == generation:
+                _scan_cache[directory] = files
     return files
 
 
-def wait_for_disk_space(*paths):
-    """Block until all paths have at least MIN_FREE_BYTES available."""
+def wait_for_disk_space(*checks):
+    """Block until every (path, min_free_bytes) check has that much space free."""
     while True:
         low = []
-        for p in paths:
+        for p, min_free in checks:
             try:
                 usage = shutil.disk_usage(p)
-                if usage.free < MIN_FREE_BYTES:
-                    low.append((p, usage.free))
+                if usage.free < min_free:
+                    low.append((p, usage.free, min_free))
             except OSError:
                 pass
         if not low:
             return
-        for p, free in low:
+        for p, free, min_free in low:
             log.warning("Low disk space on %s: %.1f MB free (need %.0f MB) — pausing",
-                        p, free / (1024 * 1024), MIN_FREE_BYTES / (1024 * 1024))
+                        p, free / (1024 * 1024), min_free / (1024 * 1024))
         time.sleep(DISK_CHECK_INTERVAL)
 
 
+def pop_due_chores(chores, periods, now):
+    """Pop the chores due by now from the heap and reschedule them; returns their names.
+
+    chores is a heap of (monotonic due time, name). All due chores are
+    popped before any is pushed back, so one with a zero period runs once
+    per call rather than forever.
+    """
+    due = []
+    while chores and chores[0][0] <= now:
+        due.append(heapq.heappop(chores)[1])
+    for chore in due:
+        heapq.heappush(chores, (now + periods[chore], chore))
+    return due
+
+
+def _bitrate_bps(rate):
+    """Parse an ffmpeg bitrate like "2500k" or "4M" into bits per second."""
+    rate = str(rate).strip()
+    scale = {"k": 1000, "K": 1000, "m": 1000000, "M": 1000000}.get(rate[-1:])
+    return int(float(rate[:-1]) * scale) if scale else int(float(rate))
+
+
+def max_clip_bytes(cfg):
+    """Upper bound on one staged clip's size at the configured video bitrate."""
+    slowest = max(p["speed_range"][1] for p in vj_effects.DAYPART_PROFILES.values())
+    longest = cfg["mixing"]["clip_max_duration"] * slowest
+    return int(_bitrate_bps(cfg["video"]["bitrate"]) / 8 * longest)
+
+
+def choose_staging_dir(cfg, reserve):
+    """Return the staging directory: configured, tmpfs if big enough, else disk.
+
+    tmpfs defaults to half of RAM, so on small hosts it can't hold a full
+    staging backlog plus the `reserve` the free-space guard asks for.
+    """
+    if cfg.get("staging_dir"):
+        return cfg["staging_dir"]
+    if os.path.isdir("/dev/shm"):
+        need = MAX_STAGING_FILES * max_clip_bytes(cfg) + reserve
+        try:
+            total = shutil.disk_usage("/dev/shm").total
+        except OSError:
+            total = 0
+        if total >= need:
+            return TMPFS_STAGING_DIR
+        log.info("/dev/shm too small for staging (%.0f MB, need %.0f MB) — using disk",
+                 total / (1024 * 1024), need / (1024 * 1024))
+    return DISK_STAGING_DIR
+
+
 def count_staging_files(staging_dir):
     """Return the number of .ts files in the staging directory."""
     try:
-        return len(globmod.glob(os.path.join(staging_dir, "*.ts")))
+        with os.scandir(staging_dir) as it:
+            return sum(1 for e in it if e.name.endswith(".ts"))
     except OSError:
         return 0
 
 
+class StagingCounter:
+    """Number of .ts files in the staging directory, kept current by inotify.
+
+    Renders creating files and the feeder deleting them arrive as events, so
+    waiting on the count wakes as soon as a slot frees up instead of
+    rescanning the directory on a timer. Falls back to polling with
+    count_staging_files when inotify is unavailable.
+    """
+
+    MASK = IN_CREATE | IN_MOVED_TO | IN_DELETE | IN_MOVED_FROM
+
+    def __init__(self, staging_dir):
+        self.staging_dir = staging_dir
+        self._inotify = None
+        try:
+            inotify = Inotify(IN_CLOEXEC | IN_NONBLOCK)
+        except OSError as e:
+            log.warning("%s — polling the staging directory instead", e)
+        else:
+            try:
+                inotify.add_watch(staging_dir, self.MASK)
+                self._inotify = inotify
+            except OSError as e:
+                log.warning("Could not watch %s: %s — polling instead", staging_dir, e)
+                inotify.close()
+        self.count = count_staging_files(staging_dir)
+
+    def _update(self, timeout):
+        """Apply pending events, waiting up to timeout seconds for the first."""
+        if self._inotify is None:
+            if timeout:
+                time.sleep(timeout)
+            self.count = count_staging_files(self.staging_dir)
+            return
+        if not select.select([self._inotify.fd], [], [], timeout)[0]:
+            return
+        try:
+            events = self._inotify.read_events()
+        except BlockingIOError:
+            return
+        for _, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Lost events; the queue is drained now, so a rescan is exact
+                self.count = count_staging_files(self.staging_dir)
+            elif not name.endswith(".ts"):
+                continue
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self.count += 1
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.count = max(0, self.count - 1)
+
+    def wait_until_below(self, limit, timeout=None):
+        """Block until fewer than limit files are staged; False if timeout ran out first."""
+        self._update(0)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.count >= limit:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+            self._update(remaining)
+        return True
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+def reset_fifo(path):
+    """Put a fresh FIFO at path, replacing any existing one in a single rename.
+
+    A spare FIFO made ahead of time is renamed over the old one, so the path
+    never goes missing and a stale writer stays on the old inode. The next
+    spare is created afterwards, outside the swap.
+    """
+    spare = path + ".spare"
+    try:
+        os.rename(spare, path)
+    except FileNotFoundError:
+        os.mkfifo(spare)
+        os.rename(spare, path)
+    try:
+        os.mkfifo(spare)
+    except FileExistsError:
+        pass
+
+
+def remove_files(directory, suffixes):
+    """Delete files in directory whose names end with suffixes (a str or tuple).
+
+    Unlinks relative to an open directory fd so each file skips a full path
+    lookup. Missing directories and files that vanish meanwhile are ignored.
+    """
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        with os.scandir(dir_fd) as it:
+            for entry in it:
+                if entry.name.endswith(suffixes):
+                    try:
+                        os.unlink(entry.name, dir_fd=dir_fd)
+                    except OSError:
+                        pass
+    finally:
+        os.close(dir_fd)
+
+
 BROADCAST_START = 10  # 10am
 BROADCAST_END = 2     # 2am (next day)
 
 
+_hour_cache = {"until": 0.0, "hour": -1}
+
+
+def _current_hour():
+    """Return the local hour, re-reading the wall clock at most once a minute.
+
+    The cached value never outlives the hour it was read in, so callers see
+    the change exactly at the top of the hour.
+    """
+    mono = time.monotonic()
+    if mono < _hour_cache["until"]:
+        return _hour_cache["hour"]
+    now = datetime.datetime.now()
+    to_next_hour = 3600 - (now.minute * 60 + now.second + now.microsecond / 1e6)
+    _hour_cache["hour"] = now.hour
+    _hour_cache["until"] = mono + min(60.0, to_next_hour)
+    return now.hour
+
+
 def is_on_air():
     """Return True if current time is within broadcast hours (10am-2am)."""
-    hour = datetime.datetime.now().hour
+    hour = _current_hour()
     return hour >= BROADCAST_START or hour < BROADCAST_END
 
 
-def wait_for_broadcast():
-    """Sleep until broadcast hours begin. Returns when it's time to go on air."""
+def wait_for_broadcast(tick=None, tick_interval=600):
+    """Sleep until broadcast hours begin. Returns when it's time to go on air.
+
+    If given, tick() is called every tick_interval seconds while off air.
+    """
     now = datetime.datetime.now()
     sign_on = now.replace(hour=BROADCAST_START, minute=0, second=0, microsecond=0)
     if now.hour >= BROADCAST_END:
@@ -148,13 +643,16 @@ def wait_for_broadcast():
     if wait_secs > 0:
         log.info("Off air until %s (sleeping %.0f minutes)",
                  sign_on.strftime("%I:%M %p"), wait_secs / 60)
-        time.sleep(wait_secs)
+        deadline = time.monotonic() + wait_secs
+        while (remaining := deadline - time.monotonic()) > 0:
+            time.sleep(min(remaining, tick_interval))
+            if tick is not None and deadline - time.monotonic() > 0:
+                tick()
 
 
-def get_current_daypart(cfg):
-    """Return the current daypart config based on time of day."""
-    hour = datetime.datetime.now().hour
-    for dp in cfg.get("dayparts", []):
+def _daypart_for_hour(dayparts, hour):
+    """Return the first daypart covering hour, or None."""
+    for dp in dayparts:
         start = dp["start_hour"]
         end = dp["end_hour"]
         if start < end:
@@ -166,6 +664,20 @@ def get_current_daypart(cfg):
     return None
 
 
+# Hour of day -> daypart, built from the config's dayparts list on first use
+_daypart_table = {"dayparts": None, "by_hour": ()}
+
+
+def get_current_daypart(cfg):
+    """Return the current daypart config based on time of day."""
+    dayparts = cfg.get("dayparts", [])
+    if dayparts is not _daypart_table["dayparts"]:
+        _daypart_table["by_hour"] = tuple(_daypart_for_hour(dayparts, hour)
+                                          for hour in range(24))
+        _daypart_table["dayparts"] = dayparts
+    return _daypart_table["by_hour"][_current_hour()]
+
+
 def get_daypart_music(cfg):
     """Get music files for the current daypart, falling back to all music."""
     dp = get_current_daypart(cfg)
@@ -183,7 +695,9 @@ def get_daypart_music(cfg):
     return files, "all"
 
 
-_clips_cache = {"daypart": None, "files": None}
+# Last get_daypart_clips result, valid while the daypart, the library scan
+# generation and the default clip list are all unchanged
+_clips_cache = {"key": None, "default": None, "result": None}
 
 
 def get_daypart_clips(cfg, default_clips):
@@ -192,43 +706,49 @@ def get_daypart_clips(cfg, default_clips):
     If clips_dayparts maps the current daypart name to a directory,
     scan that directory instead of the default clips list.
     Falls back to default_clips if no override or if the override dir is empty.
-    Caches scan results to avoid re-probing every clip each iteration.
+    Caches the result to avoid re-probing every clip each iteration.
+    Returns (clips, name of the daypart they came from or "default").
     """
     dp = get_current_daypart(cfg)
-    clips_dayparts = cfg.get("clips_dayparts", {})
     dp_name = dp["name"] if dp else None
 
-    # Return cached result if daypart hasn't changed
-    if dp_name == _clips_cache["daypart"] and _clips_cache["files"] is not None:
-        return _clips_cache["files"], dp_name or "default"
+    key = (dp_name, _scan_generation)
+    if key == _clips_cache["key"] and _clips_cache["default"] is default_clips:
+        return _clips_cache["result"]
 
-    if dp and dp_name in clips_dayparts:
-        override_dir = clips_dayparts[dp_name]
+    result = (default_clips, "default")
+    override_dir = cfg.get("clips_dayparts", {}).get(dp_name) if dp else None
+    if override_dir:
         files = scan_media_files(override_dir, MEDIA_EXTENSIONS)
         if files:
             log.info("Clips daypart '%s' — %d clips from %s",
                      dp_name, len(files), override_dir)
-            _clips_cache["daypart"] = dp_name
-            _clips_cache["files"] = files
-            return files, dp_name
-        log.warning("Clips daypart '%s' dir empty, falling back to default",
-                    dp_name)
+            result = (files, dp_name)
+        else:
+            log.warning("Clips daypart '%s' dir empty, falling back to default",
+                        dp_name)
+
+    _clips_cache["key"] = key
+    _clips_cache["default"] = default_clips
+    _clips_cache["result"] = result
+    return result
 
-    _clips_cache["daypart"] = dp_name
-    _clips_cache["files"] = default_clips
-    return default_clips, "default"
+
+# Clip and bumper picks happen only on the main thread; a generator of its
+# own keeps them off the global one the music thread shuffles with
+_rng = random.Random()
 
 
 def pick_clip(clips, min_dur, max_dur):
     """Pick a random clip and return (path, seek_start, use_duration, needs_loop)."""
-    clip_path, clip_dur = random.choice(clips)
-    use_dur = random.uniform(min_dur, max_dur)
+    clip_path, clip_dur = clips[_rng.randrange(len(clips))]
+    use_dur = _rng.uniform(min_dur, max_dur)
 
     if clip_dur <= use_dur:
         return clip_path, 0, clip_dur, True
 
     max_start = clip_dur - use_dur
-    start = random.uniform(0, max_start) if max_start > 1 else 0
+    start = _rng.uniform(0, max_start) if max_start > 1 else 0
     return clip_path, start, use_dur, False
 
 
@@ -236,6 +756,84 @@ def pick_clip(clips, min_dur, max_dur):
 # Music player thread — plays tracks continuously, independent of video clips
 # ---------------------------------------------------------------------------
 
+# The music thread is the audio clock and must never stall, so on hosts with
+# cores to spare it and the feeder each get a core of their own. Everything
+# else (main loop, renders and the ffmpeg processes they start) shares the
+# remaining cores, so encoder threads never land on those two.
+MUSIC_CPUS = {0}
+FEEDER_CPUS = {1}
+MUSIC_NICE = -5       # needs CAP_SYS_NICE; silently skipped otherwise
+MIN_CPUS_TO_PIN = 4
+
+try:
+    _STARTUP_CPUS = frozenset(os.sched_getaffinity(0))
+except (AttributeError, OSError):
+    _STARTUP_CPUS = frozenset()
+WORKER_CPUS = set(_STARTUP_CPUS - MUSIC_CPUS - FEEDER_CPUS)
+
+
+def _can_pin(cpus):
+    """True if this host has cores enough to pin work to cpus."""
+    return len(_STARTUP_CPUS) >= MIN_CPUS_TO_PIN and bool(cpus) and cpus < _STARTUP_CPUS
+
+
+def _tune_thread(name, cpus=None, nice=None):
+    """Best effort: pin the calling thread to cpus and renice it.
+
+    On Linux both calls act on the calling thread only, not the process.
+    Threads and processes it spawns afterwards inherit the setting. cpus is
+    checked against the CPUs the process started with, so a thread started
+    from an already pinned one can still be moved elsewhere.
+    """
+    if _can_pin(cpus):
+        try:
+            os.sched_setaffinity(0, cpus)
+            log.info("[%s] Pinned to CPU %s", name, ",".join(map(str, sorted(cpus))))
+        except (AttributeError, OSError) as e:
+            log.debug("[%s] Could not set CPU affinity: %s", name, e)
+    if nice:
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        except (AttributeError, OSError) as e:
+            log.debug("[%s] Could not set nice %d: %s", name, nice, e)
+
+
+PIPE_CHUNK = 1 << 20  # bytes moved per splice() call
+PIPE_SIZE = 1 << 20   # kernel buffer for the audio FIFO and streamer stdin
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+
+
+def _grow_pipe(fd):
+    """Best effort: enlarge a pipe's kernel buffer from the 64 KiB default."""
+    try:
+        fcntl.fcntl(fd, F_SETPIPE_SZ, PIPE_SIZE)
+    except OSError as e:
+        log.debug("Could not resize pipe buffer: %s", e)
+
+
+if hasattr(os, "splice"):
+    def _pipe_copy(src_fd, dst_fd):
+        """Move up to PIPE_CHUNK bytes pipe→pipe inside the kernel. Returns 0 at EOF."""
+        return os.splice(src_fd, dst_fd, PIPE_CHUNK, flags=os.SPLICE_F_MOVE)
+else:  # Python < 3.10
+    _copy_buf = threading.local()
+
+    def _pipe_copy(src_fd, dst_fd):
+        """Copy one chunk from src_fd to dst_fd. Returns 0 at EOF.
+
+        Reads into a per-thread preallocated buffer, so no bytes object is
+        created per chunk.
+        """
+        buf = getattr(_copy_buf, "view", None)
+        if buf is None:
+            buf = _copy_buf.view = memoryview(bytearray(1 << 16))
+        n = os.readv(src_fd, [buf])
+        view = buf[:n]
+        while view:
+            view = view[os.write(dst_fd, view):]
+        return n
+
+
 def music_worker(cfg, audio_fifo_path, stop_event):
     """Decode music tracks to raw PCM and write to the audio FIFO.
 
@@ -245,10 +843,12 @@ def music_worker(cfg, audio_fifo_path, stop_event):
     audio stream with no EOF between tracks.
     """
     current_daypart = None
+    _tune_thread("Music", MUSIC_CPUS, MUSIC_NICE)
 
     log.info("[Music] Opening audio FIFO (waiting for streamer)...")
     try:
-        fifo_fd = open(audio_fifo_path, "wb")
+        fifo_fd = os.open(audio_fifo_path, os.O_WRONLY)
+        _grow_pipe(fifo_fd)
     except OSError as e:
         log.error("[Music] Failed to open FIFO: %s", e)
         return
@@ -290,7 +890,7 @@ def music_worker(cfg, audio_fifo_path, stop_event):
                 # Decode track to raw PCM via FFmpeg, pipe output to our FIFO
                 proc = subprocess.Popen(
                     [
-                        "ffmpeg", "-v", "quiet",
+                        "ffmpeg", "-nostdin", "-v", "quiet",
                         "-i", track_path,
                         "-f", "s16le", "-ar", "44100", "-ac", "2",
                         "pipe:1",
@@ -299,15 +899,13 @@ def music_worker(cfg, audio_fifo_path, stop_event):
                     stderr=subprocess.DEVNULL,
                 )
 
+                src_fd = proc.stdout.fileno()
                 try:
                     while not stop_event.is_set():
-                        chunk = proc.stdout.read(65536)
-                        if not chunk:
-                            break
                         try:
-                            fifo_fd.write(chunk)
-                            fifo_fd.flush()
-                        except (BrokenPipeError, OSError):
+                            if not _pipe_copy(src_fd, fifo_fd):
+                                break
+                        except OSError:
                             log.warning("[Music] FIFO broken, stopping")
                             proc.kill()
                             return
@@ -319,7 +917,7 @@ def music_worker(cfg, audio_fifo_path, stop_event):
 
     finally:
         try:
-            fifo_fd.close()
+            os.close(fifo_fd)
         except OSError:
             pass
         log.info("[Music] Thread exiting")
@@ -329,21 +927,168 @@ def music_worker(cfg, audio_fifo_path, stop_event):
 # Video rendering — video-only clips, no audio
 # ---------------------------------------------------------------------------
 
-def _build_scale_filter(video):
-    """Build the standard scale/pad/setsar filter prefix."""
-    return (f"scale={video['width']}:{video['height']}"
+# Consumer GeForce cards allow a limited number of concurrent NVENC sessions;
+# every encode takes a slot so parallel renders never exceed it
+NVENC_SESSIONS = 3
+_nvenc_slots = threading.BoundedSemaphore(NVENC_SESSIONS)
+
+# Direct feed mode: renders alive at once (the one being fed plus the next,
+# blocked on its full stdout pipe until the feeder reaches it)
+PIPED_RENDERS = 2
+
+# MPEG-TS timestamps count a 90 kHz clock. The running stream offset is kept
+# in these integer ticks so thousands of clips add up without float drift;
+# only the per-clip -output_ts_offset is converted back to seconds.
+TS_CLOCK = 90000
+
+
+# Fixed parts of every render command line. The encoder tail depends only on
+# cfg["video"], so init_render_args() builds it once at startup.
+_FFMPEG_HEAD = ("ffmpeg", "-nostdin", "-y", "-hide_banner", "-loglevel", "warning")
+_ENCODE_ARGS = ()
+
+
+def init_render_args(cfg):
+    """Build the shared encoder arguments from the video config."""
+    global _ENCODE_ARGS
+    video = cfg["video"]
+    _ENCODE_ARGS = (
+        "-an",
+        "-c:v", video["codec"],
+        "-preset", video["preset"],
+        "-b:v", video["bitrate"],
+        "-g", str(video["fps"] * 4),
+        "-pix_fmt", video["pix_fmt"],
+    )
+
+
+def _drop_cached(paths):
+    """Ask the kernel to evict paths from the page cache.
+
+    Renders read a slice of a clip picked at random from a library much
+    larger than RAM, so those pages are rarely read again before they'd be
+    evicted anyway; dropping them right away keeps them from pushing out
+    pages that are reused. Only pass a render's main clip: the bug image,
+    bumpers and filler are read again by nearly every render, and the
+    library is shared with the NFS export and Plex, so an overlay's second
+    clip (a lighter read) is left to normal eviction.
+    """
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _start_ffmpeg(cmd, stdout=subprocess.DEVNULL, tail=500, uncache=(), cpus=None):
+    """Start ffmpeg with its stderr drained on a thread into a bounded buffer.
+
+    Returns (proc, finish); finish() waits for stderr to close and returns
+    its last `tail` bytes as text, decoded only then. It also drops the
+    `uncache` paths (library clips the render read) from the page cache.
+    ffmpeg inherits the calling thread's CPU affinity unless cpus moves it.
+    """
+    preexec_fn = None
+    if _can_pin(cpus):
+        def preexec_fn():
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError:
+                pass
+    proc = subprocess.Popen(cmd, stdout=stdout, stderr=subprocess.PIPE,
+                            preexec_fn=preexec_fn)
+    buf = bytearray()
+
+    def drain():
+        for chunk in iter(lambda: proc.stderr.read(4096), b""):
+            buf.extend(chunk)
+            del buf[:-tail]
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+
+    def finish():
+        reader.join()
+        proc.stderr.close()
+        _drop_cached(uncache)
+        return buf.decode(errors="replace")
+
+    return proc, finish
+
+
+def _run_ffmpeg(cmd, timeout, tail=500, uncache=()):
+    """Run an ffmpeg command, keeping only the last bytes of its stderr.
+
+    Returns (returncode, tail text).
+    """
+    proc, finish = _start_ffmpeg(cmd, tail=tail, uncache=uncache)
+    try:
+        returncode = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        finish()
+        raise
+    return returncode, finish()
+
+
+def _render(cmd, output_path, label, timeout=300, uncache=()):
+    """Run a render command to output_path, removing partial output on failure.
+
+    uncache lists the library clips it reads, dropped from the page cache
+    afterwards.
+    """
+    try:
+        with _nvenc_slots:
+            returncode, err_tail = _run_ffmpeg(cmd, timeout=timeout, uncache=uncache)
+        if returncode != 0:
+            log.error("%s failed (rc=%d): %s", label, returncode, err_tail)
+            try:
+                os.unlink(output_path)
+            except OSError:
+                pass
+            return False
+        return True
+    except Exception as e:
+        log.error("%s exception: %s", label, e)
+        try:
+            os.unlink(output_path)
+        except OSError:
+            pass
+        return False
+
+
+@lru_cache(maxsize=None)
+def _scale_filter(width, height):
+    """Build the standard scale/pad/setsar filter prefix for one output size."""
+    return (f"scale={width}:{height}"
             f":force_original_aspect_ratio=decrease,"
-            f"pad={video['width']}:{video['height']}:(ow-iw)/2:(oh-ih)/2,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,"
             f"setsar=1")
 
 
-def render_clip(clip_path, clip_start, clip_dur, needs_loop,
-                effects, cfg, output_path, ts_offset=0.0, speed=1.0):
-    """Pre-render a single video clip with effects to a video-only .ts file."""
+def _build_scale_filter(video):
+    """Build the standard scale/pad/setsar filter prefix."""
+    return _scale_filter(video["width"], video["height"])
+
+
+# The *_cmd builders return the ffmpeg command line for one render, writing
+# MPEG-TS to output (a staging path, or "pipe:1" for direct feed). The
+# render_* wrappers run them to a staging file.
+
+def clip_cmd(clip_path, clip_start, clip_dur, needs_loop,
+             effects, cfg, output, ts_offset=0.0, speed=1.0):
+    """Build the command for a single video clip with effects."""
     video = cfg["video"]
     bug_path = cfg.get("bug_path")
 
-    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning"]
+    cmd = list(_FFMPEG_HEAD)
 
     if needs_loop:
         cmd += ["-stream_loop", "-1"]
@@ -373,15 +1118,10 @@ def render_clip(clip_path, clip_start, clip_dur, needs_loop,
         cmd += ["-vf", vf]
 
     cmd += [
-        "-an",
-        "-c:v", video["codec"],
-        "-preset", video["preset"],
-        "-b:v", video["bitrate"],
-        "-g", str(video["fps"] * 4),
-        "-pix_fmt", video["pix_fmt"],
+        *_ENCODE_ARGS,
         "-output_ts_offset", f"{ts_offset:.3f}",
         "-f", "mpegts",
-        output_path,
+        output,
     ]
 
     clip_name = os.path.basename(clip_path)
@@ -389,32 +1129,13 @@ def render_clip(clip_path, clip_start, clip_dur, needs_loop,
     speed_label = f" speed={speed}x" if speed != 1.0 else ""
     log.info("  Render: %s [%.0fs%s] fx=%s",
              clip_name, clip_dur, speed_label, effect_names)
-
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if result.returncode != 0:
-            log.error("Render failed (rc=%d): %s",
-                      result.returncode,
-                      result.stderr[-500:] if result.stderr else "")
-            try:
-                os.unlink(output_path)
-            except OSError:
-                pass
-            return False
-        return True
-    except Exception as e:
-        log.error("Render exception: %s", e)
-        try:
-            os.unlink(output_path)
-        except OSError:
-            pass
-        return False
+    return cmd
 
 
-def render_overlay_clip(clip1_path, clip1_start, clip2_path, clip2_start,
-                        clip_dur, effects, blend_mode, cfg, output_path,
-                        ts_offset=0.0, speed=1.0):
-    """Render two clips composited together with a blend mode."""
+def overlay_cmd(clip1_path, clip1_start, clip2_path, clip2_start,
+                clip_dur, effects, blend_mode, cfg, output,
+                ts_offset=0.0, speed=1.0):
+    """Build the command for two clips composited together with a blend mode."""
     video = cfg["video"]
     bug_path = cfg.get("bug_path")
     scale = _build_scale_filter(video)
@@ -443,7 +1164,7 @@ def render_overlay_clip(clip1_path, clip1_start, clip2_path, clip2_start,
         )
 
     cmd = [
-        "ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
+        *_FFMPEG_HEAD,
         "-ss", f"{clip1_start:.2f}", "-t", f"{clip_dur:.2f}", "-i", clip1_path,
         "-ss", f"{clip2_start:.2f}", "-t", f"{clip_dur:.2f}", "-i", clip2_path,
     ]
@@ -452,14 +1173,10 @@ def render_overlay_clip(clip1_path, clip1_start, clip2_path, clip2_start,
     cmd += [
         "-filter_complex", filter_complex,
         "-map", "[out]",
-        "-an",
-        "-c:v", video["codec"],
-        "-preset", video["preset"],
-        "-b:v", video["bitrate"],
-        "-pix_fmt", video["pix_fmt"],
+        *_ENCODE_ARGS,
         "-output_ts_offset", f"{ts_offset:.3f}",
         "-f", "mpegts",
-        output_path,
+        output,
     ]
 
     clip1_name = os.path.basename(clip1_path)
@@ -469,67 +1186,133 @@ def render_overlay_clip(clip1_path, clip1_start, clip2_path, clip2_start,
     log.info("  Overlay: %s + %s [%.0fs%s] blend=%s fx=%s",
              clip1_name, clip2_name, clip_dur, speed_label,
              blend_mode, effect_names)
-
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-        if result.returncode != 0:
-            log.error("Overlay render failed (rc=%d): %s",
-                      result.returncode,
-                      result.stderr[-500:] if result.stderr else "")
-            try:
-                os.unlink(output_path)
-            except OSError:
-                pass
-            return False
-        return True
-    except Exception as e:
-        log.error("Overlay render exception: %s", e)
-        try:
-            os.unlink(output_path)
-        except OSError:
-            pass
-        return False
+    return cmd
 
 
-def render_bumper(bumper_path, cfg, output_path, ts_offset=0.0):
-    """Pre-render a bumper to a video-only .ts file (no logo bug)."""
+def bumper_cmd(bumper_path, cfg, output, ts_offset=0.0):
+    """Build the command for a bumper (no logo bug)."""
     video = cfg["video"]
     scale = _build_scale_filter(video)
 
-    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
-           "-i", bumper_path]
+    cmd = [*_FFMPEG_HEAD, "-i", bumper_path]
     cmd += ["-vf", f"{scale},fps={video['fps']}"]
 
     cmd += [
-        "-an",
-        "-c:v", video["codec"],
-        "-preset", video["preset"],
-        "-b:v", video["bitrate"],
-        "-g", str(video["fps"] * 4),
-        "-pix_fmt", video["pix_fmt"],
+        *_ENCODE_ARGS,
         "-output_ts_offset", f"{ts_offset:.3f}",
         "-f", "mpegts",
-        output_path,
+        output,
     ]
 
     log.info("  Render bumper: %s", os.path.basename(bumper_path))
+    return cmd
+
+
+def filler_cmd(duration, cfg, output, ts_offset=0.0):
+    """Build the command for `duration` seconds of black."""
+    video = cfg["video"]
+    cmd = [
+        *_FFMPEG_HEAD,
+        "-f", "lavfi",
+        "-i", f"color=c=black:s={video['width']}x{video['height']}:r={video['fps']}",
+        "-t", f"{duration:.2f}",
+        *_ENCODE_ARGS,
+        "-output_ts_offset", f"{ts_offset:.3f}",
+        "-f", "mpegts",
+        output,
+    ]
+
+    log.info("  Render filler: %.0fs black", duration)
+    return cmd
+
 
+def render_clip(clip_path, clip_start, clip_dur, needs_loop,
+                effects, cfg, output_path, ts_offset=0.0, speed=1.0):
+    """Pre-render a single video clip with effects to a video-only .ts file."""
+    cmd = clip_cmd(clip_path, clip_start, clip_dur, needs_loop,
+                   effects, cfg, output_path, ts_offset=ts_offset, speed=speed)
+    return _render(cmd, output_path, "Render", uncache=(clip_path,))
+
+
+def render_overlay_clip(clip1_path, clip1_start, clip2_path, clip2_start,
+                        clip_dur, effects, blend_mode, cfg, output_path,
+                        ts_offset=0.0, speed=1.0):
+    """Render two clips composited together with a blend mode."""
+    cmd = overlay_cmd(clip1_path, clip1_start, clip2_path, clip2_start,
+                      clip_dur, effects, blend_mode, cfg, output_path,
+                      ts_offset=ts_offset, speed=speed)
+    return _render(cmd, output_path, "Overlay render", timeout=600,
+                   uncache=(clip1_path,))
+
+
+def render_bumper(bumper_path, cfg, output_path, ts_offset=0.0):
+    """Pre-render a bumper to a video-only .ts file (no logo bug)."""
+    cmd = bumper_cmd(bumper_path, cfg, output_path, ts_offset=ts_offset)
+    return _render(cmd, output_path, "Bumper render")
+
+
+def render_filler(duration, cfg, output_path, ts_offset=0.0):
+    """Render `duration` seconds of black, standing in for a failed render.
+
+    Later clips may already be rendering with timestamps that assume this
+    slot's length, so it has to be filled to keep the MPEG-TS continuous.
+    """
+    cmd = filler_cmd(duration, cfg, output_path, ts_offset=ts_offset)
+    return _render(cmd, output_path, "Filler render")
+
+
+def queue_finished_renders(pending, workers, cfg, queue_clip):
+    """Queue finished renders in order, waiting on the oldest while one is backlogged.
+
+    pending holds (future, ts_path, dur_ticks, offset_ticks, label) in
+    submission order. One render beyond the worker count may sit in the
+    pool's queue, so every worker stays busy while the main loop picks the
+    next clip and a freed worker starts on the backlog without waiting for
+    the main thread.
+
+    A failed render with later ones pending is replaced by filler. Returns
+    the offset (in TS_CLOCK ticks) to rewind the timeline to if the last
+    pending render failed, else None.
+    """
+    rewind = None
+    while pending and (pending[0][0].done() or len(pending) > workers):
+        future, ts_path, dur_ticks, offset_ticks, label = pending.popleft()
+        if not future.result():
+            if not pending:
+                # Nothing was stamped after it, so just reuse its slot
+                log.warning("%s render failed, skipping", label)
+                rewind = offset_ticks
+                continue
+            log.warning("%s render failed, filling its slot", label)
+            if not render_filler(dur_ticks / TS_CLOCK, cfg, ts_path,
+                                 ts_offset=offset_ticks / TS_CLOCK):
+                log.warning("Filler render failed, skipping")
+                continue
+        queue_clip(ts_path)
+    return rewind
+
+
+# Direct feed: a render writing MPEG-TS to its stdout, spliced straight into
+# the streamer by the feeder. `finish` returns its stderr tail; `backfill`,
+# if set, builds the command for filler to stand in for it if it fails.
+PipedRender = collections.namedtuple("PipedRender", "proc finish label backfill",
+                                     defaults=(None,))
+
+
+def start_piped_render(cmd, label, uncache=(), backfill=None, cpus=None):
+    """Start a render writing to its stdout pipe.
+
+    Returns a PipedRender, or None (logged) if ffmpeg couldn't be started.
+    cpus pins it elsewhere than the calling thread's cores.
+    """
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if result.returncode != 0:
-            try:
-                os.unlink(output_path)
-            except OSError:
-                pass
-            return False
-        return True
-    except Exception as e:
-        log.error("Bumper render failed: %s", e)
-        try:
-            os.unlink(output_path)
-        except OSError:
-            pass
-        return False
+        proc, finish = _start_ffmpeg(cmd, stdout=subprocess.PIPE, uncache=uncache,
+                                     cpus=cpus)
+    except OSError as e:
+        log.error("%s exception: %s", label, e)
+        return None
+    _grow_pipe(proc.stdout.fileno())
+    return PipedRender(proc, finish, label, backfill)
 
 
 # ---------------------------------------------------------------------------
@@ -547,13 +1330,15 @@ def start_streamer(cfg, audio_fifo_path):
 
     cmd = [
         "ffmpeg", "-y", "-hide_banner", "-loglevel", "warning",
-        # Video input: MPEG-TS from stdin
+        # Video input: MPEG-TS from stdin. It's always our own NVENC h264
+        # output, so cap stream analysis instead of probing for seconds.
         "-re",
-        "-fflags", "+genpts",
+        "-fflags", "+genpts+nobuffer",
+        "-analyzeduration", "100000", "-probesize", "500000",
         "-f", "mpegts", "-i", "pipe:0",
         # Audio input: raw PCM from FIFO
         "-f", "s16le", "-ar", str(audio["sample_rate"]), "-ac", "2",
-        "-thread_queue_size", "4096",
+        "-thread_queue_size", "8192",
         "-i", audio_fifo_path,
         # Mapping
         "-map", "0:v", "-map", "1:a",
@@ -575,18 +1360,69 @@ def start_streamer(cfg, audio_fifo_path):
 
     log.info("Starting HLS streamer (video pipe + audio FIFO → HLS)")
     proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
-                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _grow_pipe(proc.stdin.fileno())
     return proc
 
 
+def monitor_streamer(proc, exited):
+    """Log the streamer's stderr and set the exited event when it dies.
+
+    stderr reaches EOF the moment ffmpeg exits, so a crash is noticed right
+    away instead of on the next feed or at the watchdog timeout. Reading it
+    also keeps a chatty streamer from blocking on a full stderr pipe.
+    """
+    for line in proc.stderr:
+        log.warning("[Streamer] %s", line.decode(errors="replace").rstrip())
+    proc.wait()
+    exited.set()
+
+
+def process_alive(proc):
+    """Return True while proc is running, without reaping it.
+
+    waitid(WNOWAIT) peeks at the child's state, leaving the reap to
+    whoever waits on it (the monitor thread for the streamer), and skips
+    the lock Popen.poll() takes. A zombie reads as exited, unlike with
+    kill(pid, 0).
+    """
+    if proc.returncode is not None:
+        return False
+    try:
+        return os.waitid(os.P_PID, proc.pid,
+                         os.WEXITED | os.WNOHANG | os.WNOWAIT) is None
+    except ChildProcessError:
+        return False  # already reaped
+
+
 def feed_streamer(proc, ts_path):
-    """Write raw .ts bytes into the streamer's stdin."""
+    """Write raw .ts bytes into the streamer's stdin.
+
+    The file is sent with sendfile() straight from the page cache into the
+    pipe, so the clip never passes through a Python buffer. Where sendfile
+    can't target the pipe, it falls back to a 1 MB buffered copy.
+    """
     try:
         with open(ts_path, "rb") as f:
-            data = f.read()
-        proc.stdin.write(data)
-        proc.stdin.flush()
-        size_mb = len(data) / (1024 * 1024)
+            src = f.fileno()
+            dst = proc.stdin.fileno()
+            os.posix_fadvise(src, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            size = os.fstat(src).st_size
+            sent = 0
+            try:
+                while sent < size:
+                    n = os.sendfile(dst, src, sent, size - sent)
+                    if n == 0:
+                        break  # file truncated under us
+                    sent += n
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+                    raise
+                f.seek(sent)
+                shutil.copyfileobj(f, proc.stdin, length=1 << 20)
+                proc.stdin.flush()
+                sent = f.tell()
+        size_mb = sent / (1024 * 1024)
         log.info("  Fed %.1f MB to streamer", size_mb)
         return True
     except (BrokenPipeError, OSError, ValueError) as e:
@@ -594,12 +1430,135 @@ def feed_streamer(proc, ts_path):
         return False
 
 
+def finish_piped_render(render, kill=False):
+    """Reap a piped render; returns (returncode, stderr tail)."""
+    if kill:
+        render.proc.kill()
+    render.proc.stdout.close()
+    returncode = render.proc.wait()
+    return returncode, render.finish()
+
+
+def feed_piped_render(proc, render, progress=None):
+    """Splice a piped render's output into the streamer's stdin until it exits.
+
+    progress() is called after every chunk so the watchdog sees a long clip
+    being fed as activity. A render that fails before producing anything is
+    replaced by its backfill filler. Returns True if the render (or its
+    filler) succeeded and all of its output reached the streamer.
+    """
+    sent = 0
+    ok = True
+    try:
+        src = render.proc.stdout.fileno()
+        dst = proc.stdin.fileno()
+        while n := _pipe_copy(src, dst):
+            sent += n
+            if progress:
+                progress()
+    except (OSError, ValueError) as e:
+        log.warning("Streamer pipe broken: %s", e)
+        ok = False
+    returncode, err_tail = finish_piped_render(render, kill=not ok)
+    if not ok:
+        return False
+    size_mb = sent / (1024 * 1024)
+    if returncode != 0:
+        log.error("%s failed (rc=%d) after %.1f MB: %s",
+                  render.label, returncode, size_mb, err_tail)
+        # Already-started renders carry timestamps past this one, so fill
+        # its slot. Filler after partial output would overlap what was fed,
+        # so then the stream jumps ahead by whatever wasn't produced.
+        if sent == 0 and render.backfill is not None:
+            log.warning("Filling the slot of %s", render.label)
+            # Started from the feeder thread; keep it off the feeder's core
+            filler = start_piped_render(render.backfill(), "Filler render",
+                                        cpus=WORKER_CPUS)
+            if filler is not None:
+                return feed_piped_render(proc, filler, progress)
+        return False
+    log.info("  Fed %.1f MB to streamer", size_mb)
+    return True
+
+
+class SPSCQueue:
+    """Bounded FIFO for exactly one producer thread and one consumer thread.
+
+    A deque guarded by one lock, with events to wake a consumer waiting on
+    an empty queue or a producer waiting on a full one. Raises queue.Full /
+    queue.Empty like queue.Queue so callers can treat it the same way.
+    """
+
+    def __init__(self, maxsize):
+        self._items = collections.deque()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._not_empty = threading.Event()
+        self._not_full = threading.Event()
+        self._not_full.set()
+
+    def put(self, item, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if len(self._items) < self._maxsize:
+                    self._items.append(item)
+                    self._not_empty.set()
+                    return
+                self._not_full.clear()
+            if deadline is None:
+                self._not_full.wait()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._not_full.wait(remaining):
+                    raise queue.Full
+
+    def _pop(self):
+        item = self._items.popleft()
+        if not self._items:
+            self._not_empty.clear()
+        self._not_full.set()
+        return item
+
+    def get(self):
+        while True:
+            with self._lock:
+                if self._items:
+                    return self._pop()
+            self._not_empty.wait()
+
+    def get_nowait(self):
+        with self._lock:
+            if not self._items:
+                raise queue.Empty
+            return self._pop()
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="VJ/DJ pipeline: music + VJ clips → HLS")
+    parser.add_argument("--debug-staging", action="store_true",
+                        help="Render clips to staging .ts files even when "
+                             "mixing.direct_feed is set")
+    args = parser.parse_args()
+
     cfg = load_config()
+    # Before any thread or process starts, so the streamer and piped renders
+    # spawned from here stay off the music and feeder cores
+    _tune_thread("Main", WORKER_CPUS)
+    init_render_args(cfg)
+    probe_cache_load()
+    start_library_watcher()
     log.info("VJ/DJ Pipeline starting")
     log.info("Music: %s", cfg["music_dir"])
     log.info("Clips: %s", cfg["clips_dir"])
@@ -609,31 +1568,28 @@ def main():
     os.makedirs(cfg["hls_dir"], exist_ok=True)
 
     # Clean stale HLS segments from previous runs
-    for old in globmod.glob(os.path.join(cfg["hls_dir"], "*.ts")):
-        try:
-            os.unlink(old)
-        except OSError:
-            pass
-    for old in globmod.glob(os.path.join(cfg["hls_dir"], "*.m3u8")):
-        try:
-            os.unlink(old)
-        except OSError:
-            pass
+    remove_files(cfg["hls_dir"], (".ts", ".m3u8"))
     # Remove leftover subdirs from split audio/video approach
     for subdir in ["video", "audio"]:
         subpath = os.path.join(cfg["hls_dir"], subdir)
         if os.path.isdir(subpath):
             shutil.rmtree(subpath, ignore_errors=True)
 
-    # Staging directory for pre-rendered .ts clips
-    staging_dir = os.path.join(SCRIPT_DIR, "staging")
+    # Staging directory for pre-rendered .ts clips. Its free-space guard only
+    # needs room for the renders in flight; MAX_STAGING_FILES caps the rest.
+    staging_min_free = max_clip_bytes(cfg) * (cfg["mixing"].get("render_workers", 2) + 1)
+    staging_dir = choose_staging_dir(cfg, staging_min_free)
     os.makedirs(staging_dir, exist_ok=True)
+    # tmpfs survives a crash of this process, so clear leftovers from a
+    # previous run; nothing would ever feed them
+    remove_files(staging_dir, ".ts")
+    log.info("Staging: %s", staging_dir)
+    staging_counter = StagingCounter(staging_dir)
+    ts_path_prefix = os.path.join(staging_dir, "clip_")
 
     # Audio FIFO for music thread → streamer
     audio_fifo_path = os.path.join(staging_dir, "audio_pipe")
-    if os.path.exists(audio_fifo_path):
-        os.unlink(audio_fifo_path)
-    os.mkfifo(audio_fifo_path)
+    reset_fifo(audio_fifo_path)
 
     # Scan content
     log.info("Scanning video clips...")
@@ -655,33 +1611,74 @@ def main():
     clip_max = cfg["mixing"]["clip_max_duration"]
     fx_min = cfg["mixing"]["effects_per_clip_min"]
     fx_max = cfg["mixing"]["effects_per_clip_max"]
-    bumper_cfg = cfg["bumpers"]
-    last_bumper_time = 0
-    cumulative_ts = 0.0  # running timestamp offset for continuous MPEG-TS
+    bumper_interval = cfg["bumpers"].get("min_interval_minutes", 10) * 60
+    cumulative_ts = 0  # running MPEG-TS offset, in TS_CLOCK ticks
+
+    # Renders run concurrently. Each gets its ts offset when it's submitted,
+    # and finished clips are queued strictly in submission order.
+    render_workers = cfg["mixing"].get("render_workers", 2)
+    render_pool = ThreadPoolExecutor(max_workers=render_workers,
+                                     initializer=_tune_thread,
+                                     initargs=("Render", WORKER_CPUS))
+    pending_renders = collections.deque()  # (future, ts_path, dur_ticks, offset_ticks, label)
+
+    # Direct feed: renders write to a pipe the feeder splices into the
+    # streamer, skipping staging files. Renders then run at stream pace, so
+    # there's no pre-rendered buffer to ride out a slow or failed render.
+    direct_feed = cfg["mixing"].get("direct_feed", False) and not args.debug_staging
+    piped_slots = threading.BoundedSemaphore(PIPED_RENDERS)
+    current_piped = None  # PipedRender the feeder is splicing right now
+    if direct_feed:
+        log.info("Direct feed: renders pipe straight into the streamer")
 
     seq = 0
     streamer_proc = None
+    streamer_exited = threading.Event()  # set by monitor_streamer
     music_stop_event = threading.Event()
     music_thread = None
-    feed_queue = queue.Queue(maxsize=20)
-    last_feed_time = time.time()  # watchdog: tracks last successful feed
+    feed_queue = SPSCQueue(maxsize=20)
+    # Watchdog: tracks last successful feed. All watchdog and bumper times
+    # are monotonic so an NTP step can't fire (or mask) the watchdog.
+    last_feed_time = time.monotonic()
     WATCHDOG_TIMEOUT = 90  # seconds with no feed before recovery
 
+    def touch_feed():
+        nonlocal last_feed_time
+        last_feed_time = time.monotonic()
+
+    def drop_clip(clip):
+        """Throw away a clip that will never be fed."""
+        if isinstance(clip, PipedRender):
+            finish_piped_render(clip, kill=True)
+            piped_slots.release()
+        else:
+            try:
+                os.unlink(clip)
+            except OSError:
+                pass
+
     def feeder_worker():
         """Thread that feeds rendered clips to the video streamer."""
-        nonlocal last_feed_time
+        nonlocal current_piped
+        _tune_thread("Feeder", FEEDER_CPUS)
         while True:
             item = feed_queue.get()
             if item is None:
                 break
-            ts_path, proc = item
-            if feed_streamer(proc, ts_path):
-                last_feed_time = time.time()
-            try:
-                os.unlink(ts_path)
-            except OSError:
-                pass
-            feed_queue.task_done()
+            clip, proc = item
+            # Don't feed a streamer that has already exited; recovery is coming
+            if not process_alive(proc):
+                drop_clip(clip)
+            elif isinstance(clip, PipedRender):
+                current_piped = clip
+                if feed_piped_render(proc, clip, progress=touch_feed):
+                    touch_feed()
+                current_piped = None
+                piped_slots.release()
+            else:
+                if feed_streamer(proc, clip):
+                    touch_feed()
+                drop_clip(clip)
 
     feeder_thread = threading.Thread(target=feeder_worker, daemon=True)
     feeder_thread.start()
@@ -703,18 +1700,96 @@ def main():
             music_stop_event.set()
             music_thread.join(timeout=10)
 
-    def recover_streamer():
+    def submit_render(build_cmd, *args, output_dur, label, timeout=300,
+                      uncache=(), **kwargs):
+        """Start a render at the current ts offset.
+
+        build_cmd is one of the *_cmd builders; args are its arguments up to
+        (not including) the output. The render goes to the pool and a staging
+        file, or in direct feed mode straight to the feeder as a piped render.
+        uncache lists library clips to drop from the page cache once it's done.
+        """
+        nonlocal cumulative_ts, seq
+        ts_offset = cumulative_ts / TS_CLOCK
+        dur_ticks = round(output_dur * TS_CLOCK)
+        if direct_feed:
+            # Wait for the feeder to finish a clip, but let the main loop's
+            # crash/watchdog checks run if the stream has stalled
+            while not piped_slots.acquire(timeout=5):
+                if (streamer_exited.is_set()
+                        or (time.monotonic() - last_feed_time) > WATCHDOG_TIMEOUT):
+                    return
+            cmd = build_cmd(*args, "pipe:1", ts_offset=ts_offset, **kwargs)
+            render = start_piped_render(
+                cmd, label, uncache,
+                backfill=lambda: filler_cmd(output_dur, cfg, "pipe:1",
+                                            ts_offset=ts_offset))
+            if render is None:
+                # Nothing was stamped with this offset; the next clip reuses it
+                piped_slots.release()
+                return
+            cumulative_ts += dur_ticks
+            queue_clip(render)
+            return
+        seq += 1
+        ts_path = f"{ts_path_prefix}{seq:06d}.ts"
+        cmd = build_cmd(*args, ts_path, ts_offset=ts_offset, **kwargs)
+        future = render_pool.submit(_render, cmd, ts_path, f"{label} render",
+                                    timeout, uncache)
+        pending_renders.append((future, ts_path, dur_ticks, cumulative_ts, label))
+        cumulative_ts += dur_ticks
+
+    def collect_renders():
+        """Queue finished renders for the feeder, rewinding the ts clock past a failed last one."""
+        nonlocal cumulative_ts
+        rewind = queue_finished_renders(pending_renders, render_workers, cfg, queue_clip)
+        if rewind is not None:
+            cumulative_ts = rewind
+
+    def discard_renders():
+        """Wait out in-flight renders and delete their output (timestamps are stale)."""
+        while pending_renders:
+            future, ts_path, _, _, _ = pending_renders.popleft()
+            try:
+                future.result()
+            except Exception:
+                pass
+            try:
+                os.unlink(ts_path)
+            except OSError:
+                pass
+
+    def drop_pending():
+        """Throw away every clip in the prebuffer and the feed queue."""
+        nonlocal prebuffer
+        while not feed_queue.empty():
+            try:
+                item = feed_queue.get_nowait()
+                if item is not None:
+                    drop_clip(item[0])
+            except queue.Empty:
+                break
+        for clip in prebuffer:
+            drop_clip(clip)
+        prebuffer = []
+
+    def recover_streamer(reason=None):
         """Watchdog recovery: tear down stuck streamer and restart fresh."""
-        nonlocal streamer_proc, cumulative_ts, last_feed_time, prebuffer
-        log.warning("WATCHDOG: No feed in %d seconds — recovering streamer",
-                    WATCHDOG_TIMEOUT)
+        nonlocal streamer_proc, cumulative_ts, last_feed_time
+        log.warning("WATCHDOG: %s — recovering streamer",
+                    reason or f"No feed in {WATCHDOG_TIMEOUT} seconds")
 
         try:
+            discard_renders()
+            # A stuck piped render would keep the feeder blocked reading it
+            if current_piped is not None:
+                current_piped.proc.kill()
+
             # Kill streamer FFmpeg — do NOT close stdin from main thread
             # while the feeder thread may be writing to it (unsafe concurrent
             # fd access causes SIGPIPE). Just kill the process; the feeder
             # will get BrokenPipeError when the read end of the pipe closes.
-            if streamer_proc and streamer_proc.poll() is None:
+            if streamer_proc and process_alive(streamer_proc):
                 streamer_proc.kill()
                 try:
                     streamer_proc.wait(timeout=15)
@@ -730,33 +1805,13 @@ def main():
             # and finish its current item before we drain the queue
             time.sleep(1)
 
-            # Drain the feed queue
-            while not feed_queue.empty():
-                try:
-                    item = feed_queue.get_nowait()
-                    if item is not None:
-                        ts_path, _ = item
-                        try:
-                            os.unlink(ts_path)
-                        except OSError:
-                            pass
-                    feed_queue.task_done()
-                except queue.Empty:
-                    break
+            drop_pending()
 
             # Clean staging files
-            for f in globmod.glob(os.path.join(staging_dir, "*.ts")):
-                try:
-                    os.unlink(f)
-                except OSError:
-                    pass
+            remove_files(staging_dir, ".ts")
 
-            # Recreate audio FIFO
-            try:
-                os.unlink(audio_fifo_path)
-            except OSError:
-                pass
-            os.mkfifo(audio_fifo_path)
+            # Fresh audio FIFO
+            reset_fifo(audio_fifo_path)
 
         except Exception:
             log.exception("WATCHDOG: Error during recovery")
@@ -771,68 +1826,85 @@ def main():
                     pass
 
         # Reset state — prebuffer mode will restart streamer + music
-        cumulative_ts = 0.0
-        prebuffer = []
-        last_feed_time = time.time()
+        cumulative_ts = 0
+        drop_pending()
+        last_feed_time = time.monotonic()
         log.info("WATCHDOG: Recovery complete, re-entering prebuffer phase")
 
-    prebuffer_size = 4  # render this many clips before starting streamer
+    # Render this many clips before starting the streamer. Piped renders
+    # can't buffer ahead, so direct feed starts on the first one.
+    prebuffer_size = 1 if direct_feed else 4
     prebuffer = []
 
     def start_streamer_and_flush():
         """Start the streamer and flush the pre-buffer to the feeder."""
-        nonlocal streamer_proc, last_feed_time
+        nonlocal streamer_proc, streamer_exited, last_feed_time
         log.info("Pre-buffer full (%d clips), starting streamer...",
                  len(prebuffer))
         start_music()
         time.sleep(0.5)
         streamer_proc = start_streamer(cfg, audio_fifo_path)
-        last_feed_time = time.time()  # reset watchdog so it doesn't fire immediately
+        streamer_exited = threading.Event()
+        threading.Thread(target=monitor_streamer,
+                         args=(streamer_proc, streamer_exited), daemon=True).start()
+        last_feed_time = time.monotonic()  # reset watchdog so it doesn't fire immediately
         # Flush all pre-buffered clips to the feeder
-        for ts in prebuffer:
-            feed_queue.put((ts, streamer_proc))
+        for clip in prebuffer:
+            feed_queue.put((clip, streamer_proc))
         prebuffer.clear()
         log.info("Pre-buffer flushed, streaming live")
 
-    def queue_clip(ts_path):
-        """Queue a clip for the feeder thread, pre-buffering at startup."""
+    def queue_clip(clip):
+        """Queue a clip (staging path or PipedRender) for the feeder, pre-buffering at startup."""
         nonlocal streamer_proc
         if streamer_proc is None:
-            prebuffer.append(ts_path)
+            prebuffer.append(clip)
             log.info("  Pre-buffering clip %d/%d", len(prebuffer), prebuffer_size)
             if len(prebuffer) >= prebuffer_size:
                 start_streamer_and_flush()
             return
         try:
-            feed_queue.put((ts_path, streamer_proc), timeout=WATCHDOG_TIMEOUT)
+            feed_queue.put((clip, streamer_proc), timeout=WATCHDOG_TIMEOUT)
         except queue.Full:
             log.warning("WATCHDOG: Queue full for %ds, triggering recovery",
                         WATCHDOG_TIMEOUT)
+            drop_clip(clip)
             recover_streamer()
             return
         qsize = feed_queue.qsize()
         log.info("  Queued for streamer (buffer: %d clips)", qsize)
 
+    def off_air_chores():
+        """Housekeeping while signed off, so sign-on starts rendering right away."""
+        # Nothing is queued after sign-off; sweep clips orphaned by a crash
+        remove_files(staging_dir, ".ts")
+        probe_cache_save()
+        # Rescan a library that changed overnight now rather than on the
+        # first clip after sign-on
+        if _library_watcher is not None:
+            scan_media_files(cfg["clips_dir"], MEDIA_EXTENSIONS)
+            scan_media_files(cfg["bumpers_dir"], MEDIA_EXTENSIONS)
+
     def cleanup(signum=None, frame=None):
         log.info("Shutting down...")
+        render_pool.shutdown(wait=False, cancel_futures=True)
         stop_music()
         feed_queue.put(None)
-        if streamer_proc and streamer_proc.poll() is None:
+        if streamer_proc and process_alive(streamer_proc):
             try:
                 streamer_proc.stdin.close()
             except OSError:
                 pass
             streamer_proc.terminate()
             streamer_proc.wait(timeout=10)
-        for f in globmod.glob(os.path.join(staging_dir, "*.ts")):
+        remove_files(staging_dir, ".ts")
+        staging_counter.close()
+        for path in (audio_fifo_path, audio_fifo_path + ".spare"):
             try:
-                os.unlink(f)
+                os.unlink(path)
             except OSError:
                 pass
-        try:
-            os.unlink(audio_fifo_path)
-        except OSError:
-            pass
+        probe_cache_save()
         sys.exit(0)
 
     signal.signal(signal.SIGTERM, cleanup)
@@ -840,100 +1912,105 @@ def main():
     # Prevent SIGPIPE from killing the process when writing to broken pipes
     signal.signal(signal.SIGPIPE, signal.SIG_IGN)
 
+    # Periodic chores as a heap of (monotonic due time, name); each iteration
+    # only compares against the earliest one
+    chore_periods = {"disk": DISK_CHECK_INTERVAL, "bumper": bumper_interval}
+    now = time.monotonic()
+    chores = [(now, "disk"), (now + bumper_interval, "bumper")]
+    heapq.heapify(chores)
+
     # Main loop — continuously render random video clips
     while True:
       try:
         if not is_on_air():
             # Sign off: stop everything, sleep until broadcast
             log.info("Sign off — stopping pipeline")
+            discard_renders()
             stop_music()
-            if streamer_proc and streamer_proc.poll() is None:
+            if streamer_proc and process_alive(streamer_proc):
                 streamer_proc.kill()
                 try:
                     streamer_proc.wait(timeout=10)
                 except subprocess.TimeoutExpired:
                     pass
                 streamer_proc = None
-            cumulative_ts = 0.0
-            # Recreate FIFO for next broadcast
-            try:
-                os.unlink(audio_fifo_path)
-            except OSError:
-                pass
-            os.mkfifo(audio_fifo_path)
-            wait_for_broadcast()
+            # Staged clips carry timestamps for the old timeline, and the
+            # off-air sweep would delete them from under the queue anyway
+            drop_pending()
+            cumulative_ts = 0
+            # Fresh FIFO for next broadcast
+            reset_fifo(audio_fifo_path)
+            wait_for_broadcast(tick=off_air_chores)
             log.info("Sign on — resuming broadcast")
 
+        # One clock read for the watchdog and chore checks below
+        now = time.monotonic()
+
+        # Streamer crashed: recover now rather than waiting for the watchdog
+        if streamer_proc is not None and streamer_exited.is_set():
+            recover_streamer(f"Streamer exited (rc={streamer_proc.returncode})")
+            continue
+
         # Watchdog: detect stalled feeder
         if (streamer_proc is not None
-                and (time.time() - last_feed_time) > WATCHDOG_TIMEOUT):
+                and (now - last_feed_time) > WATCHDOG_TIMEOUT):
             recover_streamer()
             continue  # restart loop in prebuffer mode
 
-        # Guard: wait for disk space on staging and HLS partitions
-        wait_for_disk_space(staging_dir, cfg["hls_dir"])
-
         # Guard: throttle if too many staging files are pending
-        while count_staging_files(staging_dir) >= MAX_STAGING_FILES:
+        while not staging_counter.wait_until_below(MAX_STAGING_FILES, timeout=5):
             log.warning("Staging has %d .ts files (max %d) — waiting for feeder",
-                        count_staging_files(staging_dir), MAX_STAGING_FILES)
-            time.sleep(5)
-
-        # Check if bumper is due (time-based)
-        now = time.time()
-        if (bumper_files
-                and last_bumper_time > 0
-                and (now - last_bumper_time) >= bumper_cfg.get("min_interval_minutes", 10) * 60):
-            bumper_path, bumper_dur = random.choice(bumper_files)
-            seq += 1
-            ts_path = os.path.join(staging_dir, f"clip_{seq:06d}.ts")
-            if render_bumper(bumper_path, cfg, ts_path, ts_offset=cumulative_ts):
-                cumulative_ts += bumper_dur
-                last_bumper_time = time.time()
-                queue_clip(ts_path)
-        elif last_bumper_time == 0:
-            last_bumper_time = time.time()
+                        staging_counter.count, MAX_STAGING_FILES)
+
+        # Run whichever chores have come due
+        for chore in pop_due_chores(chores, chore_periods, now):
+            if chore == "disk":
+                # Guard: wait for disk space on staging and HLS partitions
+                wait_for_disk_space((staging_dir, staging_min_free),
+                                    (cfg["hls_dir"], MIN_FREE_BYTES))
+            elif chore == "bumper" and bumper_files:
+                bumper_path, bumper_dur = bumper_files[_rng.randrange(len(bumper_files))]
+                submit_render(bumper_cmd, bumper_path, cfg,
+                              output_dur=bumper_dur, label="Bumper")
+                collect_renders()
+
+        # Pick up library edits (cached scans unless the watcher saw a change)
+        if _library_watcher is not None:
+            clip_files = scan_media_files(cfg["clips_dir"], MEDIA_EXTENSIONS) or clip_files
+            bumper_files = scan_media_files(cfg["bumpers_dir"], MEDIA_EXTENSIONS)
 
         # Get clips and daypart info
         active_clips, clips_daypart = get_daypart_clips(cfg, clip_files)
         dp = get_current_daypart(cfg)
         dp_name = dp["name"] if dp else None
 
-        # Daypart-aware speed
-        speed = vj_effects.pick_speed(dp_name)
-
-        # Pick primary clip
+        # Pick primary clip, then its daypart-aware speed, effects and
+        # overlay in one go
         clip_path, clip_start, clip_dur, needs_loop = pick_clip(
             active_clips, clip_min, clip_max)
-        effects = vj_effects.pick_effects(fx_min, fx_max, daypart=dp_name)
-
-        seq += 1
-        ts_path = os.path.join(staging_dir, f"clip_{seq:06d}.ts")
+        plan = vj_effects.pick_plan(fx_min, fx_max, daypart=dp_name,
+                                    allow_overlay=len(active_clips) >= 2)
 
         # Output duration accounts for speed (PTS multiplier > 1 = longer)
-        output_dur = clip_dur * speed
+        output_dur = clip_dur * plan.speed
 
-        if vj_effects.should_overlay(dp_name) and len(active_clips) >= 2:
+        if plan.overlay:
             # Overlay: composite two clips together
             clip2_path, clip2_start, _, _ = pick_clip(
                 active_clips, clip_min, clip_max)
-            blend_mode = vj_effects.pick_blend_mode(dp_name)
-            effects = vj_effects.pick_overlay_effects(fx_min, fx_max, daypart=dp_name)
-            if render_overlay_clip(
-                    clip_path, clip_start, clip2_path, clip2_start,
-                    clip_dur, effects, blend_mode, cfg, ts_path,
-                    ts_offset=cumulative_ts, speed=speed):
-                cumulative_ts += output_dur
-                queue_clip(ts_path)
-            else:
-                log.warning("Overlay render failed, skipping")
-        elif render_clip(clip_path, clip_start, clip_dur, needs_loop,
-                         effects, cfg, ts_path, ts_offset=cumulative_ts,
-                         speed=speed):
-            cumulative_ts += output_dur
-            queue_clip(ts_path)
+            submit_render(overlay_cmd,
+                          clip_path, clip_start, clip2_path, clip2_start,
+                          clip_dur, plan.effects, plan.blend_mode, cfg,
+                          speed=plan.speed, output_dur=output_dur,
+                          label="Overlay", timeout=600,
+                          uncache=(clip_path,))
         else:
-            log.warning("Clip render failed, skipping")
+            submit_render(clip_cmd,
+                          clip_path, clip_start, clip_dur, needs_loop,
+                          plan.effects, cfg, speed=plan.speed,
+                          output_dur=output_dur, label="Clip",
+                          uncache=(clip_path,))
+        collect_renders()
 
       except Exception:
             log.exception("FATAL: Unhandled exception in main loop — "
@@ -945,9 +2022,9 @@ def main():
                 log.exception("FATAL: Recovery also failed — restarting "
                               "from clean state")
                 streamer_proc = None
-                cumulative_ts = 0.0
+                cumulative_ts = 0
                 prebuffer = []
-                last_feed_time = time.time()
+                last_feed_time = time.monotonic()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,282 @@
+import os
+import random
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docs", "starlitetv_backups"))
+import tag_metadata  # noqa: E402
+
+
+EXISTING_TAGS = b"""<?xml version="1.0"?>
+<Tags>
+  <Tag>
+    <Targets />
+    <Simple><Name>ENCODER</Name><String>Lavf60.3.100</String></Simple>
+    <Simple><Name>date</Name><String>1999</String></Simple>
+  </Tag>
+  <Tag>
+    <Targets><TrackUID>1234</TrackUID></Targets>
+    <Simple><Name>DURATION</Name><String>01:30:00.000</String></Simple>
+  </Tag>
+</Tags>
+"""
+
+
+def simple_tags(tags):
+    return {s.findtext("Name"): s.findtext("String")
+            for tag in tags.findall("Tag") for s in tag.findall("Simple")}
+
+
+class FakeMkvTools:
+    """Stands in for mkvextract/mkvpropedit, recording the tags written back."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.written = None
+
+    def __call__(self, cmd, timeout, tail=200):
+        if cmd[0] == "mkvextract":
+            if self.existing is not None:
+                with open(cmd[3], "wb") as f:
+                    f.write(self.existing)
+            return 0, ""
+        assert cmd[0] == "mkvpropedit"
+        tags_path = cmd[cmd.index("--tags") + 1].split(":", 1)[1]
+        self.written = ET.parse(tags_path).getroot()
+        return 0, ""
+
+
+@pytest.fixture
+def fake_tools(monkeypatch):
+    monkeypatch.setattr(tag_metadata, "MKVEXTRACT", "mkvextract")
+    monkeypatch.setattr(tag_metadata, "MKVPROPEDIT", "mkvpropedit")
+
+    def install(existing):
+        tools = FakeMkvTools(existing)
+        monkeypatch.setattr(tag_metadata, "_run_stderr_tail", tools)
+        return tools
+    return install
+
+
+class TestMergeMkvTags:
+    def test_replaces_named_tags_case_insensitively(self):
+        tags = ET.fromstring(EXISTING_TAGS)
+        tag_metadata._merge_mkv_tags(tags, {"DATE": "1993"})
+        names = [s.findtext("Name") for s in tags.iter("Simple")]
+        assert "date" not in names
+        assert names.count("DATE") == 1
+        assert simple_tags(tags)["DATE"] == "1993"
+
+    def test_keeps_other_tags(self):
+        tags = ET.fromstring(EXISTING_TAGS)
+        tag_metadata._merge_mkv_tags(tags, {"DATE": "1993"})
+        assert simple_tags(tags)["ENCODER"] == "Lavf60.3.100"
+        assert simple_tags(tags)["DURATION"] == "01:30:00.000"
+
+    def test_creates_global_tag_when_missing(self):
+        tags = ET.Element("Tags")
+        tag_metadata._merge_mkv_tags(tags, {"DATE": "1993", "ARTIST": "x"})
+        assert len(tags.findall("Tag")) == 1
+        assert len(tags.find("Tag").find("Targets")) == 0
+        assert simple_tags(tags) == {"DATE": "1993", "ARTIST": "x"}
+
+
+class TestWriteMetadataMkv:
+    def test_existing_extra_tag_survives(self, fake_tools):
+        tools = fake_tools(EXISTING_TAGS)
+        assert tag_metadata._write_metadata_mkv("movie.mkv", "Title", "1993",
+                                                "http://poster", "A film.")
+        written = simple_tags(tools.written)
+        assert written["ENCODER"] == "Lavf60.3.100"
+        assert written["DATE"] == "1993"
+        assert written["ARTIST"] == "http://poster"
+        assert written["COMMENT"] == "A film."
+        # Track tags aren't global and must not be rewritten as global ones
+        assert "DURATION" not in written
+
+    def test_file_without_tags(self, fake_tools):
+        tools = fake_tools(None)
+        assert tag_metadata._write_metadata_mkv("movie.mkv", "Title", "1993", "", "")
+        assert set(simple_tags(tools.written)) == {"DATE", "ARTIST", "COMMENT"}
+
+    def test_extract_failure_skips_in_place_write(self, fake_tools, monkeypatch):
+        tools = fake_tools(EXISTING_TAGS)
+        monkeypatch.setattr(tag_metadata, "_run_stderr_tail",
+                            lambda cmd, timeout, tail=200: (2, "broken"))
+        assert not tag_metadata._write_metadata_mkv("movie.mkv", "Title", "1993", "", "")
+        assert tools.written is None
+
+
+class TestScanDirectoryOutput:
+    def test_each_files_output_is_one_block(self, tmp_path, monkeypatch, capsys):
+        names = [f"film-Title_{i}_1990.mp4" for i in range(6)]
+        for name in names:
+            (tmp_path / name).write_bytes(b"")
+
+        def fake_tag_one(filepath, dry_run):
+            name = os.path.basename(filepath)
+            tag_metadata._say(f"--- {name} ---")
+            # Later files finish first, so unbuffered lines would interleave
+            time.sleep(0.01 * (len(names) - names.index(name)))
+            tag_metadata._say(f"  done {name}")
+            return "tagged", "h264"
+
+        monkeypatch.setattr(tag_metadata, "_tag_one", fake_tag_one)
+        stats = tag_metadata.scan_directory(str(tmp_path), jobs=4)
+
+        assert stats["tagged"] == len(names)
+        lines = capsys.readouterr().out.splitlines()
+        expected = []
+        for name in names:
+            expected += [f"--- {name} ---", f"  done {name}"]
+        assert lines == expected
+
+    def test_say_prints_outside_workers(self, capsys):
+        tag_metadata._say("hello")
+        assert capsys.readouterr().out == "hello\n"
+
+
+def multi_pass_best_match(results, title, year=None):
+    """find_best_match as it was before ranking in one pass, for comparison."""
+    if not results:
+        return None
+    title_lower = title.lower()
+    title_words = set(title_lower.split())
+    if year:
+        for r in results:
+            if (r.get("primaryTitle", "").lower() == title_lower
+                    and str(r.get("startYear", "")) == year):
+                return r
+        for r in results:
+            r_title = r.get("primaryTitle", "").lower()
+            if (str(r.get("startYear", "")) == year
+                    and (title_lower in r_title or r_title in title_lower)):
+                return r
+        for r in results:
+            r_words = set(r.get("primaryTitle", "").lower().split())
+            if (str(r.get("startYear", "")) == year
+                    and len(title_words & r_words) >= min(2, len(title_words))):
+                return r
+        y = int(year)
+        for r in results:
+            r_title = r.get("primaryTitle", "").lower()
+            r_year_val = r.get("startYear")
+            if r_year_val and abs(int(r_year_val) - y) <= 2:
+                if title_lower in r_title or r_title in title_lower:
+                    return r
+    if not year:
+        return results[0]
+    if str(results[0].get("startYear", "")) == year:
+        return results[0]
+    return None
+
+
+class TestFindBestMatch:
+    TITLES = ["The Matrix", "Matrix", "The Matrix Reloaded", "Matrix Revolutions",
+              "The Thing", "Thing", "Alien", "Aliens"]
+
+    def test_matches_multi_pass_ranking(self):
+        rng = random.Random(42)
+        for _ in range(2000):
+            results = [{"primaryTitle": rng.choice(self.TITLES),
+                        "startYear": rng.choice([1982, 1986, 1999, 2001, 2003, None])}
+                       for _ in range(rng.randint(0, 5))]
+            for r in results:
+                if r["startYear"] is None:
+                    del r["startYear"]
+            title = rng.choice(self.TITLES)
+            year = rng.choice([None, "1982", "1999", "2001", "2003"])
+            assert (tag_metadata.find_best_match(results, title, year)
+                    is multi_pass_best_match(results, title, year)), (results, title, year)
+
+    def test_empty_results(self):
+        assert tag_metadata.find_best_match([], "Alien", "1979") is None
+
+    def test_no_year_takes_first_result(self):
+        results = [{"primaryTitle": "Aliens"}, {"primaryTitle": "Alien"}]
+        assert tag_metadata.find_best_match(results, "Alien") is results[0]
+
+    def test_exact_match_beats_earlier_partial_match(self):
+        results = [{"primaryTitle": "Alien Resurrection", "startYear": 1979},
+                   {"primaryTitle": "Alien", "startYear": 1979}]
+        assert tag_metadata.find_best_match(results, "Alien", "1979") is results[1]
+
+    def test_ties_go_to_earlier_result(self):
+        results = [{"primaryTitle": "The Thing", "startYear": 1980},
+                   {"primaryTitle": "The Thing", "startYear": 1984}]
+        assert tag_metadata.find_best_match(results, "Thing", "1982") is results[0]
+
+    def test_non_numeric_year_is_skipped(self):
+        results = [{"primaryTitle": "Alien", "startYear": "TBA"},
+                   {"primaryTitle": "Alien", "startYear": 1980}]
+        assert tag_metadata.find_best_match(results, "Alien", "1979") is results[1]
+
+    def test_far_year_without_first_result_match(self):
+        results = [{"primaryTitle": "Alien", "startYear": 2012}]
+        assert tag_metadata.find_best_match(results, "Alien", "1979") is None
+
+
+@pytest.fixture
+def cache_at(monkeypatch):
+    def use(path):
+        monkeypatch.setattr(tag_metadata, "CACHE_PATH", str(path))
+        monkeypatch.setattr(tag_metadata, "_cache_local", threading.local())
+        monkeypatch.setattr(tag_metadata, "_cache_unavailable", False)
+    return use
+
+
+class TestImdbCache:
+    def test_unwritable_cache_dir_runs_uncached(self, tmp_path, cache_at, monkeypatch):
+        blocker = tmp_path / "not_a_dir"
+        blocker.write_bytes(b"")
+        cache_at(blocker / "tag_metadata.db")
+        monkeypatch.setattr(tag_metadata, "_rate_limit", lambda: None)
+        monkeypatch.setattr(tag_metadata, "_api_get", lambda path: [{"id": "tt1"}])
+        assert tag_metadata.imdb_autocomplete("Alien") == [{"id": "tt1"}]
+        assert tag_metadata._read_tagged_marker(str(blocker)) is None
+        tag_metadata._write_tagged_marker(str(blocker), "1:2:h264")
+
+    def test_empty_results_are_not_cached(self, tmp_path, cache_at, monkeypatch):
+        cache_at(tmp_path / "tag_metadata.db")
+        monkeypatch.setattr(tag_metadata, "_rate_limit", lambda: None)
+        responses = [[], [{"id": "tt1"}]]
+        monkeypatch.setattr(tag_metadata, "_api_get", lambda path: responses.pop(0))
+        assert tag_metadata.imdb_autocomplete("Alien") == []
+        assert tag_metadata.imdb_autocomplete("Alien") == [{"id": "tt1"}]
+        # Now cached: a third call doesn't reach the API
+        assert tag_metadata.imdb_autocomplete("Alien") == [{"id": "tt1"}]
+
+
+class TestParseTitleYear:
+    @pytest.mark.parametrize("filename, expected", [
+        # The docstring examples
+        ("film-The_Lawnmower_Man_1992.mp4", ("The Lawnmower Man", "1992")),
+        ("show-Lain_1998-s01e01.mkv", ("Lain", "1998")),
+        ("Ash.vs.Evil.Dead.S01E01.El.Jefe.1080p.AMZN.WEB-DL.mkv", ("Ash vs Evil Dead", None)),
+        ("[Moozzi2] Serial Experiments Lain - 01 (BD 1520x1080).mkv",
+         ("Serial Experiments Lain", None)),
+        ("Angel.Cop.1989.1080p.BluRay.x264-OFT.mkv", ("Angel Cop", "1989")),
+        ("Fallout.S02E03.1080p.AMZN.WEB-DL.mkv", ("Fallout", None)),
+    ])
+    def test_docstring_examples(self, filename, expected):
+        assert tag_metadata.parse_title_year(filename) == expected
+
+    @pytest.mark.parametrize("filename, expected", [
+        ("film-Akira_Part1 [Group] (BD 1080p).mkv", ("Akira", None)),
+        ("film-Akira [a] [b] Part 2.mkv", ("Akira", None)),
+        ("Akira (1988) Part 2 [Group] (BD x264).mkv", ("Akira", "1988")),
+    ])
+    def test_stacked_tails(self, filename, expected):
+        assert tag_metadata.parse_title_year(filename) == expected
+
+    @pytest.mark.parametrize("filename, title", [
+        ("Part 2 [x].mkv", "Part 2"),
+        ("Part 2.mkv", "Part 2"),
+        ("[x].mkv", "[x]"),
+    ])
+    def test_never_strips_whole_title(self, filename, title):
+        assert tag_metadata.parse_title_year(filename) == (title, None)
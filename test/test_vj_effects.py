@@ -0,0 +1,113 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docs", "starlitetv_backups"))
+import vj_effects  # noqa: E402
+
+
+TIER_OF = {name: tier for tier, pool in vj_effects._TIER_POOLS.items() for name, _ in pool}
+DAYPARTS = list(vj_effects.DAYPART_PROFILES)
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    vj_effects.seed(1234)
+    yield
+    vj_effects.seed()
+
+
+class TestPickEffects:
+    @pytest.mark.parametrize("daypart", DAYPARTS)
+    def test_tier_limits(self, daypart):
+        for _ in range(2000):
+            tiers = Counter(TIER_OF[name] for name, _ in
+                            vj_effects.pick_effects(6, 6, daypart=daypart))
+            assert tiers["medium"] <= 2
+            assert tiers["heavy"] <= 1
+
+    def test_count_in_range(self):
+        for _ in range(500):
+            assert 1 <= len(vj_effects.pick_effects(1, 3)) <= 3
+
+    @pytest.mark.parametrize("daypart", DAYPARTS)
+    def test_incompatible_pairs_never_together(self, daypart):
+        for _ in range(3000):
+            names = set(vj_effects.effect_names(
+                vj_effects.pick_effects(6, 6, daypart=daypart)))
+            for pair in vj_effects.INCOMPATIBLE_PAIRS:
+                assert not pair <= names
+
+    def test_blocks_are_symmetric(self):
+        assert vj_effects._BLOCKS["edge_glow"] == {"high_saturation"}
+        assert vj_effects._BLOCKS["high_saturation"] == {"edge_glow"}
+        assert vj_effects._build_blocks([]) == {}
+
+    @pytest.mark.parametrize("daypart", DAYPARTS)
+    def test_tier_frequencies_follow_profile(self, daypart):
+        # One effect per pick, so tier limits never come into play
+        n = 20000
+        tiers = Counter(TIER_OF[vj_effects.pick_effects(1, 1, daypart=daypart)[0][0]]
+                        for _ in range(n))
+        weights = vj_effects.DAYPART_PROFILES[daypart]["tier_weights"]
+        for tier, weight in zip(vj_effects._TIERS, weights):
+            assert tiers[tier] / n == pytest.approx(weight, abs=0.02)
+
+    def test_unknown_daypart_uses_default(self):
+        vj_effects.seed(7)
+        unknown = [vj_effects.pick_effects(daypart="brunch") for _ in range(50)]
+        vj_effects.seed(7)
+        default = [vj_effects.pick_effects(daypart="default") for _ in range(50)]
+        assert unknown == default
+
+
+class TestShapes:
+    def test_filter_string_and_names(self):
+        effects = [("warm_shift", "colorbalance=rs=0.15"), ("vignette", "vignette=PI/4")]
+        assert vj_effects.build_filter_string(effects) == "colorbalance=rs=0.15,vignette=PI/4"
+        assert vj_effects.effect_names(effects) == ["warm_shift", "vignette"]
+        assert vj_effects.build_filter_string([]) == ""
+
+    def test_effects_are_name_filter_tuples(self):
+        for name, flt in vj_effects.pick_effects(3, 3):
+            assert name in TIER_OF
+            assert isinstance(flt, str) and flt
+
+    @pytest.mark.parametrize("daypart", DAYPARTS)
+    def test_pick_plan(self, daypart):
+        profile = vj_effects.DAYPART_PROFILES[daypart]
+        low, high = profile["speed_range"]
+        for _ in range(500):
+            plan = vj_effects.pick_plan(1, 3, daypart=daypart)
+            assert isinstance(plan, vj_effects.ClipPlan)
+            assert low <= plan.speed <= high
+            assert isinstance(plan.overlay, bool)
+            if plan.overlay:
+                assert plan.blend_mode in profile["blend_modes"]
+            else:
+                assert plan.blend_mode is None
+            assert 1 <= len(plan.effects) <= 3 + bool(plan.overlay)
+
+    def test_pick_plan_without_overlay(self):
+        for _ in range(500):
+            plan = vj_effects.pick_plan(daypart="overnight", allow_overlay=False)
+            assert not plan.overlay and plan.blend_mode is None
+
+    def test_pick_plan_is_reproducible(self):
+        vj_effects.seed(99)
+        first = [vj_effects.pick_plan(daypart="nighttime") for _ in range(20)]
+        vj_effects.seed(99)
+        assert [vj_effects.pick_plan(daypart="nighttime") for _ in range(20)] == first
+
+    def test_pick_schedule(self):
+        profile = vj_effects.DAYPART_PROFILES["daytime"]
+        effects, speeds, overlays, blend_modes = vj_effects.pick_schedule(8, daypart="daytime")
+        assert len(effects) == len(speeds) == len(overlays) == len(blend_modes) == 8
+        low, high = profile["speed_range"]
+        assert all(low <= s <= high for s in speeds)
+        assert all(isinstance(o, bool) for o in overlays)
+        assert all(b in profile["blend_modes"] for b in blend_modes)
+        assert all(1 <= len(e) <= 3 for e in effects)
+        assert vj_effects.pick_schedule(0) == ([], [], [], [])
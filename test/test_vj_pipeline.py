@@ -0,0 +1,331 @@
+import heapq
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "docs", "starlitetv_backups"))
+import vj_pipeline  # noqa: E402
+
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+
+CFG = {
+    "video": {"bitrate": "2500k"},
+    "mixing": {"clip_max_duration": 45},
+}
+
+
+class TestStagingDir:
+    def test_max_clip_bytes_uses_slowest_speed(self):
+        slowest = max(p["speed_range"][1]
+                      for p in vj_pipeline.vj_effects.DAYPART_PROFILES.values())
+        assert vj_pipeline.max_clip_bytes(CFG) == int(2500000 / 8 * 45 * slowest)
+
+    def test_bitrate_units(self):
+        assert vj_pipeline._bitrate_bps("2500k") == 2500000
+        assert vj_pipeline._bitrate_bps("4M") == 4000000
+        assert vj_pipeline._bitrate_bps(800000) == 800000
+
+    def test_configured_dir_wins(self):
+        cfg = dict(CFG, staging_dir="/srv/staging")
+        assert vj_pipeline.choose_staging_dir(cfg, 0) == "/srv/staging"
+
+    @pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="no /dev/shm")
+    def test_small_tmpfs_falls_back_to_disk(self, monkeypatch):
+        # A 2 GB host: tmpfs is 1 GB, less than a full backlog plus the reserve
+        monkeypatch.setattr(vj_pipeline.shutil, "disk_usage",
+                            lambda p: DiskUsage(1 << 30, 0, 1 << 30))
+        reserve = vj_pipeline.max_clip_bytes(CFG) * 3  # two render workers + one
+        assert vj_pipeline.choose_staging_dir(CFG, reserve) == vj_pipeline.DISK_STAGING_DIR
+
+    @pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="no /dev/shm")
+    def test_large_tmpfs_is_used(self, monkeypatch):
+        monkeypatch.setattr(vj_pipeline.shutil, "disk_usage",
+                            lambda p: DiskUsage(8 << 30, 0, 8 << 30))
+        assert vj_pipeline.choose_staging_dir(CFG, 0) == vj_pipeline.TMPFS_STAGING_DIR
+
+    def test_disk_guard_uses_per_path_threshold(self, monkeypatch):
+        free = {"/staging": 200 << 20, "/hls": 2 << 30}
+        monkeypatch.setattr(vj_pipeline.shutil, "disk_usage",
+                            lambda p: DiskUsage(0, 0, free[p]))
+        monkeypatch.setattr(vj_pipeline.time, "sleep", pytest.fail)
+        # Returns at once: 200 MB covers the staging reserve even though it's
+        # far below the 1 GB HLS guard
+        vj_pipeline.wait_for_disk_space(("/staging", 100 << 20),
+                                        ("/hls", vj_pipeline.MIN_FREE_BYTES))
+
+
+class TestRenderUncache:
+    def test_only_listed_clips_are_dropped(self, monkeypatch):
+        dropped = []
+        monkeypatch.setattr(vj_pipeline, "_drop_cached",
+                            lambda paths: dropped.extend(paths))
+        cmd = ["sh", "-c", "exit 0", "-i", "/lib/bug.png", "-i", "/lib/clip.mp4"]
+        assert vj_pipeline._render(cmd, "/nonexistent/out.ts", "Clip render",
+                                   uncache=("/lib/clip.mp4",))
+        assert dropped == ["/lib/clip.mp4"]
+
+    def test_nothing_dropped_by_default(self, monkeypatch):
+        dropped = []
+        monkeypatch.setattr(vj_pipeline, "_drop_cached",
+                            lambda paths: dropped.extend(paths))
+        assert vj_pipeline._render(["sh", "-c", "exit 0", "-i", "/lib/bumper.mp4"],
+                                   "/nonexistent/out.ts", "Bumper render")
+        assert dropped == []
+
+    def test_overlay_drops_only_main_clip(self, monkeypatch):
+        seen = {}
+        monkeypatch.setattr(vj_pipeline, "overlay_cmd", lambda *a, **kw: ["true"])
+        monkeypatch.setattr(vj_pipeline, "_render",
+                            lambda cmd, out, label, timeout, uncache: seen.update(uncache=uncache))
+        vj_pipeline.render_overlay_clip("/lib/a.mp4", 0, "/lib/b.mp4", 0, 10, (),
+                                        "screen", CFG, "/staging/out.ts")
+        assert seen["uncache"] == ("/lib/a.mp4",)
+
+
+@pytest.fixture
+def streamer():
+    proc = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    yield proc
+    if proc.poll() is None:
+        proc.kill()
+        proc.wait()
+    proc.stdout.close()
+
+
+def fed_bytes(proc):
+    proc.stdin.close()
+    return proc.stdout.read()
+
+
+class TestPipedBackfill:
+    def test_failed_render_is_replaced_by_filler(self, streamer, monkeypatch):
+        pinned = {}
+        start_ffmpeg = vj_pipeline._start_ffmpeg
+
+        def recording_start(cmd, cpus=None, **kwargs):
+            pinned[cmd[-1]] = cpus
+            return start_ffmpeg(cmd, cpus=cpus, **kwargs)
+        monkeypatch.setattr(vj_pipeline, "_start_ffmpeg", recording_start)
+
+        render = vj_pipeline.start_piped_render(
+            ["sh", "-c", "exit 1"], "Clip",
+            backfill=lambda: ["sh", "-c", "printf filler"])
+        assert vj_pipeline.feed_piped_render(streamer, render)
+        assert fed_bytes(streamer) == b"filler"
+        # The feeder starts the filler, which must not inherit its core
+        assert pinned == {"exit 1": None, "printf filler": vj_pipeline.WORKER_CPUS}
+
+    def test_partial_output_is_not_backfilled(self, streamer):
+        render = vj_pipeline.start_piped_render(
+            ["sh", "-c", "printf clip; exit 1"], "Clip",
+            backfill=lambda: ["sh", "-c", "printf filler"])
+        assert not vj_pipeline.feed_piped_render(streamer, render)
+        assert fed_bytes(streamer) == b"clip"
+
+    def test_no_backfill_leaves_gap(self, streamer):
+        render = vj_pipeline.start_piped_render(["sh", "-c", "exit 1"], "Clip")
+        assert not vj_pipeline.feed_piped_render(streamer, render)
+        assert fed_bytes(streamer) == b""
+
+
+class TestProbeCachePrune:
+    @pytest.fixture(autouse=True)
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(vj_pipeline, "PROBE_CACHE_PATH", tmp_path / "probe_cache.json")
+        monkeypatch.setattr(vj_pipeline, "_probe_cache", {})
+        monkeypatch.setattr(vj_pipeline, "_ffprobe_duration", lambda path: 10.0)
+
+    def test_deleted_files_are_dropped(self, tmp_path):
+        lib = tmp_path / "clips"
+        lib.mkdir()
+        for name in ("a.mp4", "b.mp4"):
+            (lib / name).write_bytes(b"x")
+        other = str(tmp_path / "music" / "song.mp3")
+        vj_pipeline._probe_cache[other] = [0, 0, 200.0]
+
+        vj_pipeline.scan_media_files(lib, {".mp4"})
+        (lib / "b.mp4").unlink()
+        vj_pipeline.scan_media_files(lib, {".mp4"})
+
+        # Entries under other roots are left for their own scans
+        assert set(vj_pipeline._probe_cache) == {str(lib / "a.mp4"), other}
+
+    def test_failed_walk_keeps_entries(self, tmp_path, monkeypatch):
+        lib = tmp_path / "clips"
+        lib.mkdir()
+        gone = str(lib / "sub" / "c.mp4")
+        vj_pipeline._probe_cache[gone] = [0, 0, 5.0]
+
+        def unreadable(path):
+            raise OSError(5, "Input/output error", path)
+        monkeypatch.setattr(vj_pipeline.os, "scandir", unreadable)
+        vj_pipeline.scan_media_files(lib, {".mp4"})
+        assert gone in vj_pipeline._probe_cache
+
+
+class TestSPSCQueue:
+    def test_same_results_as_queue_queue(self):
+        ops = ["put", "put", "get", "put", "put", "put", "get", "get", "put",
+               "get", "get", "get", "get"]
+        fast, ref = vj_pipeline.SPSCQueue(maxsize=3), queue.Queue(maxsize=3)
+        for i, op in enumerate(ops):
+            outcomes = []
+            for q in (fast, ref):
+                try:
+                    if op == "put":
+                        q.put(i, timeout=0)
+                        outcomes.append(("put", q.qsize()))
+                    else:
+                        outcomes.append(("get", q.get_nowait()))
+                except (queue.Full, queue.Empty) as e:
+                    outcomes.append(type(e))
+            assert outcomes[0] == outcomes[1], (i, op)
+            assert fast.empty() == ref.empty()
+
+    def test_put_times_out_when_full(self):
+        q = vj_pipeline.SPSCQueue(maxsize=1)
+        q.put("a")
+        with pytest.raises(queue.Full):
+            q.put("b", timeout=0.05)
+        assert q.qsize() == 1
+
+    def test_get_nowait_on_empty(self):
+        q = vj_pipeline.SPSCQueue(maxsize=1)
+        assert q.empty()
+        with pytest.raises(queue.Empty):
+            q.get_nowait()
+
+    def test_blocked_put_resumes_after_get(self):
+        q = vj_pipeline.SPSCQueue(maxsize=1)
+        q.put("a")
+        producer = threading.Thread(target=q.put, args=("b",))
+        producer.start()
+        assert q.get() == "a"
+        producer.join(timeout=5)
+        assert not producer.is_alive()
+        assert q.get_nowait() == "b"
+
+    def test_threads_keep_order(self):
+        q = vj_pipeline.SPSCQueue(maxsize=4)
+        received = []
+
+        def consume():
+            while (item := q.get()) is not None:
+                received.append(item)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        for i in range(5000):
+            q.put(i)
+        q.put(None)
+        consumer.join(timeout=10)
+        assert received == list(range(5000))
+
+
+class FakeFiller:
+    """Stands in for render_filler, recording (duration, path, ts_offset)."""
+
+    def __init__(self):
+        self.calls = []
+        self.ok = True
+
+    def __call__(self, duration, cfg, output_path, ts_offset=0.0):
+        self.calls.append((duration, output_path, ts_offset))
+        return self.ok
+
+
+def done(ok):
+    future = Future()
+    future.set_result(ok)
+    return future
+
+
+def pending_render(future, n):
+    """A pending_renders entry for the n-th 10 s clip."""
+    tick = vj_pipeline.TS_CLOCK
+    return (future, f"/staging/clip_{n:06d}.ts", 10 * tick, 10 * n * tick, f"Clip {n}")
+
+
+class TestQueueFinishedRenders:
+    @pytest.fixture
+    def fillers(self, monkeypatch):
+        fake = FakeFiller()
+        monkeypatch.setattr(vj_pipeline, "render_filler", fake)
+        return fake
+
+    def collect(self, pending, workers=2):
+        queued = []
+        rewind = vj_pipeline.queue_finished_renders(pending, workers, CFG, queued.append)
+        return queued, rewind
+
+    def test_waits_for_head_even_if_later_render_is_done(self, fillers):
+        pending = deque([pending_render(Future(), 0), pending_render(done(True), 1)])
+        assert self.collect(pending) == ([], None)
+        assert fillers.calls == []
+        assert len(pending) == 2
+
+    def test_queues_in_submission_order(self, fillers):
+        pending = deque(pending_render(done(True), n) for n in range(3))
+        queued, rewind = self.collect(pending)
+        assert queued == [f"/staging/clip_{n:06d}.ts" for n in range(3)]
+        assert rewind is None and not pending
+
+    def test_backlog_beyond_workers_waits_on_head(self, fillers):
+        def slow_render():
+            time.sleep(0.05)
+            return True
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = deque([pending_render(pool.submit(slow_render), 0),
+                             pending_render(Future(), 1), pending_render(Future(), 2)])
+            queued, _ = self.collect(pending)
+        # Blocked on the oldest render only until the backlog was back to
+        # one per worker
+        assert queued == ["/staging/clip_000000.ts"]
+        assert len(pending) == 2
+
+    def test_failed_render_is_filled(self, fillers):
+        pending = deque([pending_render(done(False), 0), pending_render(done(True), 1)])
+        queued, rewind = self.collect(pending)
+        assert fillers.calls == [(10.0, "/staging/clip_000000.ts", 0.0)]
+        assert queued == ["/staging/clip_000000.ts", "/staging/clip_000001.ts"]
+        assert rewind is None
+
+    def test_failed_filler_is_skipped(self, fillers):
+        fillers.ok = False
+        pending = deque([pending_render(done(True), 0), pending_render(done(False), 1),
+                         pending_render(done(True), 2)])
+        queued, _ = self.collect(pending)
+        assert queued == ["/staging/clip_000000.ts", "/staging/clip_000002.ts"]
+
+    def test_failed_last_render_rewinds(self, fillers):
+        pending = deque([pending_render(done(True), 0), pending_render(done(False), 1)])
+        queued, rewind = self.collect(pending)
+        assert queued == ["/staging/clip_000000.ts"]
+        assert rewind == 10 * vj_pipeline.TS_CLOCK
+        assert fillers.calls == []
+
+
+class TestChores:
+    def test_zero_interval_runs_once_per_pass(self):
+        periods = {"disk": 30, "bumper": 0}
+        chores = [(0.0, "disk"), (0.0, "bumper")]
+        heapq.heapify(chores)
+        runs = [vj_pipeline.pop_due_chores(chores, periods, now) for now in (0.0, 1.0, 2.0)]
+        assert runs == [["bumper", "disk"], ["bumper"], ["bumper"]]
+
+    def test_reschedules_by_period(self):
+        periods = {"disk": 30, "bumper": 600}
+        chores = [(0.0, "disk"), (600.0, "bumper")]
+        heapq.heapify(chores)
+        assert vj_pipeline.pop_due_chores(chores, periods, 5.0) == ["disk"]
+        assert sorted(chores) == [(35.0, "disk"), (600.0, "bumper")]
+        assert vj_pipeline.pop_due_chores(chores, periods, 20.0) == []